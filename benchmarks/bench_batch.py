@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark: one yt-dlp call per link vs batched multi-URL metadata calls
+
+Runs the metadata prefetch against the fake yt-dlp with the same number of
+workers, once with a batch size of 1 and once batched.
+
+Usage: python benchmarks/bench_batch.py [--startup 0.3] [--per-url 0.02]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import fake_catalogue  # noqa: E402
+import fake_ytdlp  # noqa: E402
+from ytdawn import YTDawn  # noqa: E402
+
+
+def time_prefetch(tmp, count, workers, batch_size):
+    """Time a metadata prefetch of `count` fresh links"""
+    json_file = Path(tmp) / f"downloads-{count}-{batch_size}.json"
+    links = fake_catalogue.make_links(f"b{batch_size}x", count)
+    # Every tenth link is unavailable, to include partial batch failures
+    for item in links[::10]:
+        item["link"] += "broken"
+    fake_catalogue.write_catalogue(
+        json_file, links, {"default-path": str(Path(tmp) / "out")}
+    )
+
+    app = YTDawn(
+        json_file=json_file, workers=workers, batch_size=batch_size, engine="subprocess"
+    )
+    app.normalize_links("audio")
+
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        app.fetch_metadata(app.store.links("audio"), "audio")
+    elapsed = time.perf_counter() - start
+
+    resolved = sum(1 for item in app.store.links("audio") if item["title"])
+    assert resolved == count - len(links[::10]), resolved
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--startup", type=float, default=0.3)
+    parser.add_argument("--per-url", type=float, default=0.02)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--counts", type=int, nargs="+", default=[20, 100, 400])
+    args = parser.parse_args()
+
+    os.environ["FAKE_YTDLP_LATENCY"] = str(args.startup)
+    os.environ["FAKE_YTDLP_URL_LATENCY"] = str(args.per_url)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fake_ytdlp.install(Path(tmp) / "bin")
+
+        print(f"{'links':>6} {'per-link':>10} {'batched':>10} {'speedup':>8}")
+        for count in args.counts:
+            single = time_prefetch(tmp, count, args.workers, 1)
+            batched = time_prefetch(tmp, count, args.workers, args.batch_size)
+            print(
+                f"{count:>6} {single:>9.2f}s {batched:>9.2f}s "
+                f"{single / batched:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
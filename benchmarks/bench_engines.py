@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Benchmark: subprocess vs in-process yt-dlp engine on real links
+
+Resolves the same URLs with every available engine and reports wall time
+per link. Needs network access and the yt_dlp package.
+
+Usage: python benchmarks/bench_engines.py URL [URL ...] [--rounds 2]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ytdawn import InProcessEngine, SubprocessEngine  # noqa: E402
+
+
+def time_engine(engine, urls, rounds):
+    """Resolve every URL `rounds` times and return seconds per link"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for url in urls:
+            engine.get_metadata(url)
+    return (time.perf_counter() - start) / (rounds * len(urls))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("urls", nargs="+")
+    parser.add_argument("--rounds", type=int, default=2)
+    args = parser.parse_args()
+
+    engines = [SubprocessEngine()]
+    try:
+        engines.append(InProcessEngine())
+    except ImportError:
+        print("yt_dlp not importable - only benchmarking the subprocess engine")
+
+    print(f"{'engine':>12} {'per link':>10}")
+    for engine in engines:
+        per_link = time_engine(engine, args.urls, args.rounds)
+        print(f"{engine.name:>12} {per_link:>9.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: indexed find_link vs the old linear scan on 100k links
+
+Usage: python benchmarks/bench_find_link.py [--links 100000] [--lookups 1000]
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import fake_catalogue  # noqa: E402
+from ytdawn import YTDawn  # noqa: E402
+
+
+def linear_find(app, link, media_type):
+    """The pre-index find_link: walk the whole list"""
+    for i, item in enumerate(app.store.links(media_type)):
+        if item.get("link") == link:
+            return i, item
+    return None, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--links", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_file = Path(tmp) / "downloads.json"
+        records = fake_catalogue.make_links("v", args.links)
+        links = [item["link"] for item in records]
+        fake_catalogue.write_catalogue(json_file, records, {"default-path": tmp})
+        app = YTDawn(json_file=json_file, engine="subprocess")
+        app.store.count("audio")  # Parse the catalogue before tmp goes away
+
+    queries = random.Random(0).sample(links, args.lookups)
+
+    start = time.perf_counter()
+    for link in queries:
+        linear_find(app, link, "audio")
+    linear = (time.perf_counter() - start) / args.lookups
+
+    start = time.perf_counter()
+    app.find_link(queries[0], "audio")
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for link in queries:
+        app.find_link(link, "audio")
+    indexed = (time.perf_counter() - start) / args.lookups
+
+    print(f"links:           {args.links}")
+    print(f"index build:     {build * 1000:.1f} ms (once per load)")
+    print(f"linear lookup:   {linear * 1e6:.1f} us")
+    print(f"indexed lookup:  {indexed * 1e6:.2f} us")
+    print(f"speedup:         {linear / indexed:.0f}x")
+    print(
+        f"full batch scan: {linear * args.links:.1f} s linear vs "
+        f"{build + indexed * args.links:.2f} s indexed"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark: sequential vs pooled metadata prefetch against the fake yt-dlp
+
+Usage: python benchmarks/bench_metadata.py [--latency 0.2] [--workers 8]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import fake_catalogue  # noqa: E402
+import fake_ytdlp  # noqa: E402
+from ytdawn import YTDawn  # noqa: E402
+
+
+def make_catalogue(tmp, count, name):
+    """Write a downloads.json with `count` links that have no metadata yet"""
+    # A separate file per run, so no run sees another's metadata cache
+    json_file = Path(tmp) / f"downloads-{count}-{name}.json"
+    return fake_catalogue.write_catalogue(
+        json_file,
+        fake_catalogue.make_links("bench", count),
+        {"default-path": str(Path(tmp) / "out")},
+    )
+
+
+def time_prefetch(json_file, workers):
+    """Time one full metadata prefetch with the given pool width"""
+    # One URL per call, so only the pool width differs between runs
+    app = YTDawn(json_file=json_file, workers=workers, batch_size=1)
+    app.normalize_links("audio")
+    items = app.store.links("audio")
+
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        app.fetch_metadata(items, "audio")
+    elapsed = time.perf_counter() - start
+
+    assert all(item["title"] for item in app.store.links("audio"))
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--counts", type=int, nargs="+", default=[4, 16, 64])
+    args = parser.parse_args()
+
+    os.environ["FAKE_YTDLP_LATENCY"] = str(args.latency)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fake_ytdlp.install(Path(tmp) / "bin")
+
+        print(f"{'links':>6} {'sequential':>12} {'pooled':>12} {'speedup':>8}")
+        for count in args.counts:
+            seq = time_prefetch(make_catalogue(tmp, count, "seq"), 1)
+            pooled = time_prefetch(make_catalogue(tmp, count, "pool"), args.workers)
+            print(f"{count:>6} {seq:>11.2f}s {pooled:>11.2f}s {seq / pooled:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory of catalogue records, plain dicts vs LinkRecord
+
+Generates a downloads.json of N links (all in one download folder, as a
+real library is) and loads its links once as plain dicts and once as
+LinkRecords built while parsing, the way JsonStore loads them. Reports
+the memory held by the loaded links and the peak while loading (both from
+tracemalloc), and the load time, which tracemalloc slows down. Also
+checks that the records write back to the same JSON.
+
+Usage: python benchmarks/bench_records.py [--sizes 10000 200000]
+"""
+
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import fake_catalogue  # noqa: E402
+from ytdawn import LinkRecord  # noqa: E402
+
+
+def make_catalogue(size):
+    """downloads.json text with `size` audio links, some with extra fields"""
+    links = fake_catalogue.make_links("r", size, path="C:\\Users\\me\\Music\\YTDawn")
+    for i, record in enumerate(links):
+        # Titles and sizes as long and as varied as a real library's
+        record["title"] = f"Some Artist - Track Number {i} (Official Audio)"
+        record["filesize"] += i
+        record["is_downloaded"] = i % 4 != 0
+        if i % 3 == 0:
+            record["format"] = "mp3"
+        if i % 10 == 0:
+            record["priority"] = 1
+    return json.dumps(fake_catalogue.make_catalogue(links), indent=2)
+
+
+def load(text, records):
+    """The parsed links list, as LinkRecords (like JsonStore) if records is set"""
+    hook = LinkRecord.json_hook if records else None
+    return json.loads(text, object_hook=hook)["audio"]["links"]
+
+
+def measure(text, records):
+    """(bytes held, peak bytes, seconds) for loading the links"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    links = load(text, records)
+    elapsed = time.perf_counter() - start
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del links
+    return held, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 200000])
+    args = parser.parse_args()
+
+    print(
+        f"{'links':>7} {'model':<10} {'held':>9} {'per link':>9} "
+        f"{'peak':>9} {'load':>8}"
+    )
+    for size in args.sizes:
+        text = make_catalogue(size)
+        original = json.loads(text)
+        converted = {**original, "audio": {"links": load(text, True)}}
+        if json.loads(json.dumps(converted, default=dict)) != original:
+            sys.exit("LinkRecord did not round-trip to the same JSON")
+
+        for model, records in (("dict", False), ("LinkRecord", True)):
+            # Untimed warm-up run, then the measured one
+            load(text, records)
+            held, peak, elapsed = measure(text, records)
+            print(
+                f"{size:>7} {model:<10} {held / 1048576:>6.1f}MiB "
+                f"{held / size:>7.0f} B {peak / 1048576:>6.1f}MiB "
+                f"{elapsed:>7.3f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark: CLI startup time of the quick commands
+
+Copies ytdawn.py next to a generated catalogue (it always uses the
+downloads.json beside the script) and times `-la`, `-lv`, `-aa` and `-da`
+with nothing pending, each run in a fresh interpreter the way the Windows
+launcher starts it. Reports the median time above a bare `python -c pass`
+and how many yt-dlp processes each command started.
+
+With --budget MS the script exits non-zero when any command's overhead
+goes over MS milliseconds, so it can guard startup in CI.
+
+Usage: python benchmarks/bench_startup.py [--sizes 100 10000] [--runs 5]
+           [--budget 100]
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import fake_catalogue  # noqa: E402
+import fake_ytdlp  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+COMMANDS = (
+    ["-la"],
+    ["-lv"],
+    ["-aa", "https://youtu.be/startup0001"],
+    ["-da"],
+)
+
+
+def make_catalogue(json_file, size, out_dir):
+    """Write a catalogue of `size` downloaded audio links"""
+    links = fake_catalogue.make_links("d", size, is_downloaded=True, path=str(out_dir))
+    fake_catalogue.write_catalogue(json_file, links, {"default-path": str(out_dir)})
+
+
+def time_command(app_dir, args, runs, call_log):
+    """Median wall time of `ytdawn <args>` and yt-dlp calls of the last run"""
+    launcher = "import ytdawn; ytdawn.main()"
+    times = []
+    for _ in range(runs):
+        call_log.write_text("")
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", launcher, *args],
+            cwd=app_dir,
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), len(call_log.read_text().splitlines())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10000])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, help="Max overhead in ms")
+    args = parser.parse_args()
+
+    over_budget = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        fake_ytdlp.install(tmp / "bin")
+        call_log = tmp / "calls.log"
+        os.environ["FAKE_YTDLP_CALL_LOG"] = str(call_log)
+
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            subprocess.run([sys.executable, "-c", "pass"], check=True)
+        baseline = (time.perf_counter() - start) / args.runs
+        print(f"bare interpreter: {baseline * 1000:.0f} ms\n")
+
+        print(f"{'links':>7} {'command':<6} {'overhead':>9} {'procs':>6}")
+        for size in args.sizes:
+            app_dir = tmp / f"app-{size}"
+            app_dir.mkdir()
+            shutil.copy(ROOT / "ytdawn.py", app_dir)
+            make_catalogue(app_dir / "downloads.json", size, app_dir / "out")
+
+            for command in COMMANDS:
+                elapsed, calls = time_command(app_dir, command, args.runs, call_log)
+                overhead = (elapsed - baseline) * 1000
+                print(f"{size:>7} {command[0]:<6} {overhead:>6.0f} ms {calls:>6}")
+                if args.budget and overhead > args.budget:
+                    over_budget.append(f"{command[0]} on {size} links")
+
+    if over_budget:
+        print(f"\nOver the {args.budget:.0f} ms budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: YTDawn's own overhead on generated catalogues
+
+Builds a catalogue per size (downloaded links with full metadata plus a
+tail of pending links without any) and runs every scenario in a fresh
+process against the fake yt-dlp:
+
+  load      construct YTDawn (read and index the catalogue)
+  list      list_links_cli("audio")
+  view      view_all_links(), resolving the pending titles
+  add       add_link_cli() for --adds new links
+  download  process_downloads("audio") for the pending tail
+
+Each run reports wall time (without the load, except for "load" itself),
+yt-dlp processes started, bytes written to the catalogue (downloads.json,
+its journal and temp file, or growth of the SQLite database and WAL) and
+the peak RSS of the process.
+
+Usage: python benchmarks/bench_suite.py [--sizes 100 1000 10000 100000]
+           [--scenarios load list view add download] [--pending 50]
+           [--storage json|sqlite] [--engine subprocess] [--startup 0]
+           [--per-url 0] [--throughput 0] [--fail-rate 0]
+           [--progress-lines 10] [--json results.json]
+"""
+
+import argparse
+import builtins
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import fake_catalogue  # noqa: E402
+import fake_ytdlp  # noqa: E402
+from ytdawn import YTDawn  # noqa: E402
+
+SCENARIOS = ("load", "list", "view", "add", "download")
+
+
+def make_catalogue(json_file, size, pending, out_dir):
+    """Write a catalogue of `size` audio links, the last `pending` not done"""
+    links = fake_catalogue.make_links(
+        "d", size - pending, is_downloaded=True, path=str(out_dir)
+    )
+    # Added by hand: no metadata and no normalized fields yet
+    links += fake_catalogue.make_links("p", pending)
+    fake_catalogue.write_catalogue(json_file, links, {"default-path": str(out_dir)})
+
+
+def count_writes(prefix):
+    """Count bytes written through open() to files whose path starts with prefix"""
+    written = [0]
+    real_open = builtins.open
+
+    def counting_open(file, mode="r", *args, **kwargs):
+        f = real_open(file, mode, *args, **kwargs)
+        if any(c in mode for c in "wax+") and str(file).startswith(prefix):
+            write = f.write
+
+            def counted(data):
+                written[0] += len(data.encode() if isinstance(data, str) else data)
+                return write(data)
+
+            f.write = counted
+        return f
+
+    builtins.open = counting_open
+    return written
+
+
+def db_size(json_file):
+    """Bytes in the SQLite database and its WAL, if present"""
+    db_file = json_file.with_suffix(".db")
+    wal_file = db_file.with_name(db_file.name + "-wal")
+    return sum(p.stat().st_size for p in (db_file, wal_file) if p.exists())
+
+
+def peak_rss():
+    """Peak resident set size of this process in bytes (None if unknown)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def run_scenario(args):
+    """Child process: run one scenario and print its result as JSON"""
+    json_file = Path(args.catalogue)
+    written = count_writes(str(json_file))
+    db_before = db_size(json_file)
+
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        start = time.perf_counter()
+        app = YTDawn(json_file=json_file, engine=args.engine, storage=args.storage)
+        if args.run == "load":
+            app.store.count("audio")  # The JSON catalogue is parsed on first use
+        loaded = time.perf_counter()
+
+        if args.run == "list":
+            app.list_links_cli("audio")
+        elif args.run == "view":
+            app.view_all_links()
+        elif args.run == "add":
+            for i in range(args.adds):
+                app.add_link_cli(fake_catalogue.make_link("n", i), "audio")
+        elif args.run == "download":
+            app.process_downloads("audio")
+        end = time.perf_counter()
+
+    result = {
+        "seconds": (loaded - start) if args.run == "load" else (end - loaded),
+        "written": written[0] + max(0, db_size(json_file) - db_before),
+        "rss": peak_rss(),
+    }
+    print(json.dumps(result))
+
+
+def run_child(args, scenario, json_file, call_log):
+    """Run a scenario in a fresh interpreter, return its result dict"""
+    call_log.write_text("")
+    cmd = [
+        sys.executable,
+        __file__,
+        "--run",
+        scenario,
+        "--catalogue",
+        str(json_file),
+        "--storage",
+        args.storage,
+        "--engine",
+        args.engine,
+        "--adds",
+        str(args.adds),
+    ]
+    output = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["processes"] = len(call_log.read_text().splitlines())
+    return result
+
+
+def format_bytes(size):
+    if size is None:
+        return "n/a"
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GiB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000]
+    )
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--pending", type=int, default=50)
+    parser.add_argument("--adds", type=int, default=100)
+    parser.add_argument("--storage", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--engine", default="subprocess")
+    parser.add_argument("--startup", type=float, default=0.0)
+    parser.add_argument("--per-url", type=float, default=0.0)
+    parser.add_argument("--throughput", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--progress-lines", type=int, default=10)
+    parser.add_argument("--json", metavar="FILE", help="Also write results here")
+    parser.add_argument("--run", choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument("--catalogue", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_scenario(args)
+        return
+
+    os.environ["FAKE_YTDLP_LATENCY"] = str(args.startup)
+    os.environ["FAKE_YTDLP_URL_LATENCY"] = str(args.per_url)
+    os.environ["FAKE_YTDLP_THROUGHPUT"] = str(args.throughput)
+    os.environ["FAKE_YTDLP_FAIL_RATE"] = str(args.fail_rate)
+    os.environ["FAKE_YTDLP_PROGRESS_LINES"] = str(args.progress_lines)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        fake_ytdlp.install(tmp / "bin")
+        call_log = tmp / "calls.log"
+        os.environ["FAKE_YTDLP_CALL_LOG"] = str(call_log)
+
+        print(
+            f"{'links':>7} {'scenario':<9} {'time':>9} {'procs':>6} "
+            f"{'written':>9} {'peak rss':>9}"
+        )
+        for size in args.sizes:
+            template = tmp / f"template-{size}.json"
+            make_catalogue(template, size, min(args.pending, size), tmp / "out")
+
+            for scenario in args.scenarios:
+                # Every run starts from the same fresh catalogue
+                run_dir = tmp / f"{size}-{scenario}"
+                run_dir.mkdir()
+                json_file = run_dir / "downloads.json"
+                json_file.write_bytes(template.read_bytes())
+                out_dir = run_dir / "out"
+                data = json.loads(json_file.read_text())
+                data["meta"]["default-path"] = str(out_dir)
+                json_file.write_text(json.dumps(data, indent=2))
+                if args.storage == "sqlite":
+                    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+                        YTDawn(json_file=json_file, storage="sqlite").import_json(
+                            json_file
+                        )
+
+                result = run_child(args, scenario, json_file, call_log)
+                result.update(links=size, scenario=scenario)
+                results.append(result)
+                print(
+                    f"{size:>7} {scenario:<9} {result['seconds']:>8.3f}s "
+                    f"{result['processes']:>6} {format_bytes(result['written']):>9} "
+                    f"{format_bytes(result['rss']):>9}",
+                    flush=True,
+                )
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark: several worker processes sharing one catalogue
+
+Generates a catalogue of pending audio links (with metadata, so only
+downloads start yt-dlp) and runs `process_downloads("audio")` in N
+processes at once against the fake yt-dlp, all pointed at the same
+downloads.json and download folder. Reports the wall time and how often
+each URL was downloaded, and exits non-zero if any URL was downloaded
+more than once, was not downloaded, or is not marked downloaded in the
+catalogue afterwards.
+
+With --kill-after S the first worker is killed S seconds in. The links it
+had claimed are taken over by the others once its leases expire (the
+lease TTL is set to --ttl seconds), or by the retry pass that runs after
+all workers exit.
+
+Usage: python benchmarks/bench_workers.py [--workers 4] [--links 40]
+           [--throughput 40] [--kill-after 0] [--ttl 3]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from contextlib import redirect_stdout
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import fake_catalogue  # noqa: E402
+import fake_ytdlp  # noqa: E402
+from ytdawn import YTDawn  # noqa: E402
+
+
+def make_catalogue(json_file, size, out_dir, ttl):
+    """Write a catalogue of `size` pending audio links with metadata"""
+    fake_catalogue.write_catalogue(
+        json_file,
+        fake_catalogue.make_links("w", size, is_downloaded=False),
+        {"default-path": str(out_dir), "engine": "subprocess", "lease-ttl": ttl},
+    )
+
+
+def run_worker(catalogue):
+    """Child process: download whatever is pending"""
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        YTDawn(json_file=Path(catalogue)).process_downloads("audio")
+
+
+def download_counts(call_log):
+    """{url: downloads started} from the fake's call log"""
+    counts = Counter()
+    for line in call_log.read_text().splitlines():
+        words = line.split()
+        if "--progress-template" in words:
+            counts.update(w for w in words if w.startswith("http"))
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--links", type=int, default=40)
+    parser.add_argument("--throughput", type=float, default=40.0)
+    parser.add_argument("--kill-after", type=float, default=0.0)
+    parser.add_argument("--ttl", type=float, default=3.0)
+    parser.add_argument("--run", metavar="CATALOGUE", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_worker(args.run)
+        return
+
+    os.environ["FAKE_YTDLP_THROUGHPUT"] = str(args.throughput)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        fake_ytdlp.install(tmp / "bin")
+        call_log = tmp / "calls.log"
+        os.environ["FAKE_YTDLP_CALL_LOG"] = str(call_log)
+        json_file = tmp / "downloads.json"
+        make_catalogue(json_file, args.links, tmp / "out", args.ttl)
+
+        cmd = [sys.executable, __file__, "--run", str(json_file)]
+        start = time.perf_counter()
+        workers = [subprocess.Popen(cmd) for _ in range(args.workers)]
+        if args.kill_after:
+            time.sleep(args.kill_after)
+            workers[0].kill()
+            print(f"killed worker 1 after {args.kill_after:.1f}s")
+        for worker in workers:
+            worker.wait()
+        elapsed = time.perf_counter() - start
+
+        # Whatever a killed worker left behind is picked up by the next run
+        leftover = YTDawn(json_file=json_file).store.pending("audio")
+        if leftover:
+            time.sleep(args.ttl)
+            subprocess.run(cmd, check=True)
+
+        counts = download_counts(call_log)
+        app = YTDawn(json_file=json_file)
+        urls = [item["link"] for item in app.store.links("audio")]
+        duplicates = [url for url in urls if counts[url] > 1]
+        missing = [url for url in urls if not counts[url]]
+        not_marked = [item["link"] for item in app.store.pending("audio")]
+
+    print(
+        f"{args.workers} workers, {args.links} links: {elapsed:.2f}s, "
+        f"{sum(counts.values())} downloads, {len(leftover)} left for the rerun"
+    )
+    print(
+        f"downloaded twice: {len(duplicates)}, never: {len(missing)}, "
+        f"not marked downloaded: {len(not_marked)}"
+    )
+    if args.kill_after:
+        # The killed worker's in-flight downloads are legitimately restarted
+        duplicates = [url for url in duplicates if counts[url] > 2]
+    if duplicates or missing or not_marked:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Generated downloads.json catalogues shared by the benchmarks
+
+Links are youtu.be URLs with 11-character IDs made of a prefix and a
+number, so every benchmark (and every run within one) can use its own
+prefix and never share metadata cache entries or files with another.
+Complete records carry the title and size the fake yt-dlp reports.
+"""
+
+import json
+from pathlib import Path
+
+import fake_ytdlp
+
+
+def make_link(prefix, number):
+    """youtu.be URL whose video ID is prefix plus the zero-padded number"""
+    return f"https://youtu.be/{prefix}{number:0{11 - len(prefix)}d}"
+
+
+def make_links(prefix, count, **fields):
+    """`count` audio link records, bare or complete
+
+    Without fields the links are bare, as added by hand before any
+    metadata is resolved. With fields (e.g. is_downloaded=True) they are
+    complete records with fake_ytdlp's title and size, updated with fields.
+    """
+    links = []
+    for number in range(count):
+        link = make_link(prefix, number)
+        if not fields:
+            links.append({"link": link})
+            continue
+        info = fake_ytdlp.fake_info(link)
+        record = {
+            "link": link,
+            "title": info["title"],
+            "is_downloaded": False,
+            "format": "opus",
+            "path": "",
+            "filesize": info["filesize"],
+        }
+        record.update(fields)
+        links.append(record)
+    return links
+
+
+def make_catalogue(audio, meta=None, video=()):
+    """downloads.json data holding the given link records"""
+    return {
+        "audio": {"links": list(audio)},
+        "video": {"links": list(video)},
+        "meta": dict(meta or {}),
+    }
+
+
+def write_catalogue(json_file, audio, meta=None, video=()):
+    """Write make_catalogue() to json_file and return its path"""
+    json_file = Path(json_file)
+    data = make_catalogue(audio, meta, video)
+    json_file.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    return json_file
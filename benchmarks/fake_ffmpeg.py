@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Deterministic stand-in for the ffmpeg and ffprobe executables
+
+Run as `fake_ffmpeg.py ffprobe ...` or `fake_ffmpeg.py ffmpeg ...` (the
+launchers written by fake_ytdlp.install() do this). ffprobe reports the
+audio codec from the file extension the way YouTube streams use them
+(webm/opus -> opus, m4a -> aac). ffmpeg copies the input to the output
+file; a conversion (anything but -c:a copy) keeps one CPU core busy for
+FAKE_FFMPEG_SECONDS seconds, while a remux is instant.
+"""
+
+import os
+import shutil
+import sys
+import time
+
+CODECS = {".webm": "opus", ".opus": "opus", ".m4a": "aac", ".mp3": "mp3"}
+
+
+def ffprobe(argv):
+    print(CODECS.get(os.path.splitext(argv[-1])[1].lower(), "unknown"))
+    return 0
+
+
+def ffmpeg(argv):
+    source = argv[argv.index("-i") + 1]
+    if argv[argv.index("-c:a") + 1] != "copy":
+        deadline = time.process_time() + float(
+            os.environ.get("FAKE_FFMPEG_SECONDS", "0")
+        )
+        while time.process_time() < deadline:
+            pass
+    shutil.copyfile(source, argv[-1])
+    return 0
+
+
+def main(argv):
+    tool, args = argv[0], argv[1:]
+    return ffprobe(args) if tool == "ffprobe" else ffmpeg(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
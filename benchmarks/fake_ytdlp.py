@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Deterministic stand-in for the yt-dlp executable used by the benchmarks
+
+Answers --version, --get-title and --dump-json and simulates downloads
+without touching the network. Process startup cost is simulated with
+FAKE_YTDLP_LATENCY and per-URL resolve time with FAKE_YTDLP_URL_LATENCY
+(both in seconds). Metadata lookups of URLs containing "broken" fail like
+unavailable videos, and FAKE_YTDLP_FAIL_RATE (0-1) fails that share of all
+other IDs, always the same ones. Downloads print FAKE_YTDLP_PROGRESS_LINES
+progress lines and take size / FAKE_YTDLP_THROUGHPUT (MiB/s, 0 = instant);
+video downloads (no -x) report those lines as fragments and are saved in
+the --merge-output-format container (default webm). Any -f selector other
+than bestaudio picks a video+audio pair (requested_formats) five times the
+audio size.
+Downloads of URLs containing "private" fail as unavailable videos and
+those containing "throttled" with HTTP Error 429.
+Every call (its options, then its URLs) is appended to the
+FAKE_YTDLP_CALL_LOG file if set.
+install() also puts the fake ffmpeg/ffprobe of fake_ffmpeg.py on PATH.
+
+Playlist (list=...) and channel (/@name) URLs list FAKE_YTDLP_PLAYLIST_SIZE
+flat entries. Playlists grow at the end, channels at the top (newest first),
+so raising the size simulates new uploads.
+"""
+
+import json
+import os
+import re
+import stat
+import sys
+import time
+from pathlib import Path
+
+VERSION = "2099.01.01"
+
+
+def video_id(url):
+    """Derive a stable fake video ID from a URL"""
+    if "v=" in url:
+        return url.split("v=", 1)[1].split("&", 1)[0]
+    return url.rstrip("/").rsplit("/", 1)[-1]
+
+
+def fails(url):
+    """Whether a URL's metadata lookup is simulated to fail"""
+    if "broken" in url:
+        return True
+    rate = float(os.environ.get("FAKE_YTDLP_FAIL_RATE", "0"))
+    return sum(map(ord, video_id(url))) * 7919 % 1000 < rate * 1000
+
+
+def fake_info(url, fmt="bestaudio"):
+    """Build a --dump-json record for a URL and -f selector"""
+    vid = video_id(url)
+    info = {
+        "id": vid,
+        "title": f"Fake Track {vid}",
+        "webpage_url": url,
+        "original_url": url,
+        "filesize": 1024 * 1024 * (1 + sum(map(ord, vid)) % 64),
+        "duration": 180,
+    }
+    if fmt != "bestaudio":
+        # Merged selections have no size of their own, like yt-dlp's
+        audio = info.pop("filesize")
+        info["requested_formats"] = [
+            {"format_id": "248", "filesize": 4 * audio},
+            {"format_id": "251", "filesize": audio},
+        ]
+    return info
+
+
+def fake_size(info):
+    """Bytes a download of an info record writes"""
+    formats = info.get("requested_formats") or [info]
+    return sum(f["filesize"] for f in formats)
+
+
+def flat_entries(url, start):
+    """Yield --flat-playlist records for a playlist or channel URL"""
+    size = int(os.environ.get("FAKE_YTDLP_PLAYLIST_SIZE", "50"))
+    channel = "list=" not in url
+    name = re.sub(r"\W", "", url.split("list=", 1)[-1] if not channel else url)[-8:]
+    for position in range(start, size + 1):
+        number = size - position + 1 if channel else position
+        vid = f"{name}{number:05d}"
+        yield {
+            "id": vid,
+            "title": f"Fake Track {vid}",
+            "url": f"https://www.youtube.com/watch?v={vid}",
+            "_type": "url",
+        }
+
+
+def option(argv, *names, default=None):
+    """Return the value following the first of names in argv"""
+    for name in names:
+        if name in argv:
+            return argv[argv.index(name) + 1]
+    return default
+
+
+def progress_line(template, progress):
+    """Render a --progress-template "download:" template, NA for missing fields"""
+    template = template.split("download:", 1)[-1]
+    return re.sub(
+        r"%\(progress\.(\w+)\)s",
+        lambda m: str(progress.get(m.group(1), "NA")),
+        template,
+    )
+
+
+DOWNLOAD_ERRORS = {
+    "private": "ERROR: [youtube] {id}: Private video. Sign in if you've been "
+    "granted access to this video",
+    "throttled": "ERROR: unable to download video data: HTTP Error 429: "
+    "Too Many Requests",
+}
+
+
+def download(url, argv):
+    """Emit yt-dlp style progress lines and write the output file
+
+    Returns False (after printing a yt-dlp style error) for simulated
+    failures.
+    """
+    info = fake_info(url, option(argv, "-f", default="bestaudio"))
+    for marker, error in DOWNLOAD_ERRORS.items():
+        if marker in url:
+            print(error.format(id=info["id"]), file=sys.stderr, flush=True)
+            return False
+    out_dir = Path(option(argv, "-P", "--paths", default="."))
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    size = fake_size(info)
+    steps = max(1, int(os.environ.get("FAKE_YTDLP_PROGRESS_LINES", "10")))
+    throughput = float(os.environ.get("FAKE_YTDLP_THROUGHPUT", "0"))
+    speed = (throughput or 10) * 1048576
+    template = option(argv, "--progress-template")
+    for step in range(1, steps + 1):
+        if throughput:
+            time.sleep(size / 1048576 / throughput / steps)
+        downloaded = size * step // steps
+        if template:
+            progress = {
+                "downloaded_bytes": downloaded,
+                "total_bytes": size,
+                "speed": speed,
+                "eta": int((size - downloaded) / speed),
+            }
+            if "-x" not in argv:
+                progress.update(fragment_index=step, fragment_count=steps)
+            print(progress_line(template, progress), flush=True)
+            continue
+        print(
+            f"[download] {step * 100 / steps:5.1f}% of {size / 1048576:.2f}MiB "
+            f"at {throughput or 10:.2f}MiB/s ETA 00:00",
+            flush=True,
+        )
+
+    ext = option(argv, "--audio-format") or option(
+        argv, "--merge-output-format", default="webm"
+    )
+    (out_dir / f"{info['title']} [{info['id']}].{ext}").write_bytes(b"\0" * 1024)
+    return True
+
+
+def write_launcher(bin_dir, name, script, *args):
+    """Write an executable `name` into bin_dir that runs script with args"""
+    if os.name == "nt":
+        shim = bin_dir / f"{name}.bat"
+        args = "".join(f" {a}" for a in args)
+        shim.write_text(f'@echo off\r\n"{sys.executable}" "{script}"{args} %*\r\n')
+    else:
+        shim = bin_dir / name
+        args = "".join(f" {a}" for a in args)
+        shim.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{script}"{args} "$@"\n')
+        shim.chmod(shim.stat().st_mode | stat.S_IEXEC)
+    return shim
+
+
+def install(bin_dir):
+    """Write yt-dlp, ffmpeg and ffprobe launchers into bin_dir, first on PATH"""
+    bin_dir = Path(bin_dir)
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    here = Path(__file__).resolve().parent
+
+    shim = write_launcher(bin_dir, "yt-dlp", here / "fake_ytdlp.py")
+    for tool in ("ffmpeg", "ffprobe"):
+        write_launcher(bin_dir, tool, here / "fake_ffmpeg.py", tool)
+
+    os.environ["PATH"] = str(bin_dir) + os.pathsep + os.environ.get("PATH", "")
+    return shim
+
+
+def main(argv):
+    call_log = os.environ.get("FAKE_YTDLP_CALL_LOG")
+    if call_log:
+        with open(call_log, "a") as f:
+            # Options, then the URLs (one line per call)
+            f.write(" ".join(sorted(argv, key=lambda a: a.startswith("http"))) + "\n")
+
+    time.sleep(float(os.environ.get("FAKE_YTDLP_LATENCY", "0")))
+
+    if "--version" in argv:
+        print(VERSION)
+        return 0
+
+    urls = [a for a in argv if a.startswith("http")]
+
+    if "--get-title" in argv:
+        for url in urls:
+            print(fake_info(url)["title"])
+        return 0
+
+    url_latency = float(os.environ.get("FAKE_YTDLP_URL_LATENCY", "0"))
+    failed = False
+
+    if "--flat-playlist" in argv:
+        start = int(option(argv, "--playlist-items", default="1:").split(":")[0])
+        for url in urls:
+            for entry in flat_entries(url, start):
+                time.sleep(url_latency)
+                print(json.dumps(entry), flush=True)
+        return 0
+
+    if "--dump-json" in argv:
+        for url in urls:
+            time.sleep(url_latency)
+            if fails(url):
+                print(
+                    f"ERROR: [youtube] {video_id(url)}: Video unavailable",
+                    file=sys.stderr,
+                )
+                failed = True
+                if "--ignore-errors" not in argv:
+                    break
+                continue
+            info = fake_info(url, option(argv, "-f", default="bestaudio"))
+            print(json.dumps(info), flush=True)
+        return 1 if failed else 0
+
+    results = [download(url, argv) for url in urls]
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
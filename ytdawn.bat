@@ -1,4 +1,5 @@
 @echo off
 REM YTDawn Launcher - Add this file's directory to your PATH environment variable
 
-python "%~dp0ytdawn.py" %*
+REM Importing (instead of running the script) lets Python reuse the cached bytecode
+python -c "import sys; sys.path.insert(0, r'%~dp0.'); import ytdawn; ytdawn.main()" %*
@@ -5,24 +5,1922 @@ Simple and clean downloader using yt-dlp with minimal console output
 """
 
 import argparse
+import atexit
+import functools
+import hashlib
+import itertools
 import json
 import os
 import re
+import shutil
+import socket
 import subprocess
 import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from collections.abc import MutableMapping
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
 
+DEFAULT_METADATA_WORKERS = 8
+# URLs per yt-dlp metadata call, and its timeout (grows with the batch)
+DEFAULT_METADATA_BATCH_SIZE = 20
+METADATA_TIMEOUT = 15
+METADATA_TIMEOUT_PER_LINK = 5
+DEFAULT_DOWNLOAD_JOBS = 3
+# Video: best streams merged (no re-encode) into one file, fetching up to
+# DEFAULT_FRAGMENT_JOBS DASH/HLS fragments of each download at once
+DEFAULT_VIDEO_FORMAT = "bestvideo*+bestaudio/best"
+VIDEO_CONTAINERS = ("mp4", "mkv", "webm", "mov")
+DEFAULT_FRAGMENT_JOBS = 4
+# Audio is downloaded as the native stream into a per-link folder under
+# SOURCE_DIR and then converted to the record's format by ffmpeg:
+# format -> (extension, codec name, ffmpeg muxer, encoder options)
+SOURCE_DIR = ".ytdawn-sources"
+AUDIO_FORMATS = {
+    "opus": ("opus", "opus", "opus", ["-c:a", "libopus", "-b:a", "128k"]),
+    "mp3": ("mp3", "mp3", "mp3", ["-c:a", "libmp3lame", "-q:a", "2"]),
+    "m4a": ("m4a", "aac", "ipod", ["-c:a", "aac", "-b:a", "192k"]),
+    "ogg": ("ogg", "vorbis", "ogg", ["-c:a", "libvorbis", "-q:a", "5"]),
+    "flac": ("flac", "flac", "flac", ["-c:a", "flac"]),
+    "wav": ("wav", "pcm_s16le", "wav", ["-c:a", "pcm_s16le"]),
+}
+ENGINES = ("auto", "subprocess", "inprocess", "asyncio")
+DOWNLOAD_ORDERS = ("fifo", "smallest", "largest")
+STORAGES = ("json", "sqlite")
+# Fold the change journal into downloads.json after this many entries
+JOURNAL_COMPACT_EVERY = 500
 
-class YTDawn:
-    def __init__(self, json_file="downloads.json"):
-        # Get the directory where the script is located
-        self.script_dir = Path(__file__).parent.resolve()
-        # Always use the script's directory for the JSON file
-        self.json_file = self.script_dir / json_file
-        self.data = self.load_json()
+# Seconds between change checks in watch mode (one stat() call each)
+DEFAULT_WATCH_INTERVAL = 2
+# Metadata cache: entries expire after a week, at most this many are kept,
+# and failed lookups are retried after 1 min, 2 min, 4 min ... up to a day
+DEFAULT_METADATA_TTL = 7 * 24 * 3600
+DEFAULT_METADATA_CACHE_SIZE = 10000
+METADATA_RETRY_BASE = 60
+METADATA_RETRY_MAX = 24 * 3600
+# Output filename template; the [id] suffix is what the file index keys on
+OUTPUT_TEMPLATE = "%(title)s [%(id)s].%(ext)s"
+# Progress lines yt-dlp prints for us: a marker, then space-separated
+# fields (yt-dlp prints NA for unknown ones). Parsed by parse_progress()
+PROGRESS_MARKER = "ytdawn-progress"
+PROGRESS_TEMPLATE = (
+    f"download:{PROGRESS_MARKER} %(progress.downloaded_bytes)s "
+    "%(progress.total_bytes)s %(progress.total_bytes_estimate)s "
+    "%(progress.speed)s %(progress.eta)s "
+    "%(progress.fragment_index)s %(progress.fragment_count)s"
+)
+# Seconds between redraws of the progress display
+PROGRESS_REFRESH = 0.25
+# Failed downloads, by cause: (first retry delay in seconds, attempts before
+# the link is given up on). Delays double per attempt up to RETRY_MAX, with
+# jitter; "unavailable" (private, removed, geo-blocked) is never retried
+RETRY_POLICY = {
+    "timeout": (60, 5),
+    "rate-limited": (15 * 60, 8),
+    "unavailable": (0, 1),
+    "extractor": (3600, 3),
+    "conversion": (60, 3),
+    "error": (60, 5),
+}
+RETRY_MAX = 24 * 3600
+# Seconds a worker's claim on a link lasts without being renewed; a claim
+# left behind by a dead worker is taken over after this
+DEFAULT_LEASE_TTL = 60
+# Lowercase snippets of yt-dlp error messages, checked in this order
+FAILURE_PATTERNS = (
+    ("rate-limited", ("http error 429", "too many requests")),
+    (
+        "unavailable",
+        (
+            "private video",
+            "video unavailable",
+            "has been removed",
+            "not available in your country",
+            "not made this video available",
+            "members-only",
+            "sign in to confirm your age",
+            "account associated with this video has been terminated",
+        ),
+    ),
+    ("timeout", ("timed out", "timeout")),
+    ("extractor", ("unsupported url", "unable to extract", "extractorerror")),
+)
+
+# Hide console windows for child processes on Windows
+CREATE_NO_WINDOW = subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0
+
+
+class SubprocessEngine:
+    """yt-dlp backend that runs every operation as its own process"""
+
+    name = "subprocess"
+    metrics = None  # Set by YTDawn to time every yt-dlp process
+
+    def span(self, name):
+        """Timing span on the attached Metrics, or a throwaway record"""
+        return self.metrics.span(name) if self.metrics else nullcontext({})
+
+    def version(self):
+        """Return the yt-dlp version string (raises FileNotFoundError)"""
+        result = subprocess.run(
+            ["yt-dlp", "--version"],
+            capture_output=True,
+            text=True,
+            creationflags=CREATE_NO_WINDOW,
+        )
+        return result.stdout.strip()
+
+    def probe(self, cache_file):
+        """Check that yt-dlp runs, return its version
+
+        The answer is cached in cache_file against the executable's path,
+        mtime and size, so `yt-dlp --version` only runs again after yt-dlp
+        is moved or updated. Raises FileNotFoundError when it is missing.
+        """
+        binary = shutil.which("yt-dlp")
+        if binary is None:
+            raise FileNotFoundError("yt-dlp")
+        stat = os.stat(binary)
+        key = [binary, stat.st_mtime_ns, stat.st_size]
+
+        try:
+            with open(cache_file, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("binary") == key:
+                return cached["version"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+        version = self.version()
+        try:
+            with open(cache_file, "w", encoding="utf-8") as f:
+                json.dump({"binary": key, "version": version}, f)
+        except OSError:
+            pass  # Just probe again next time
+        return version
+
+    def get_metadata(self, link, timeout=METADATA_TIMEOUT):
+        """Fetch the full --dump-json info dict for the best audio format"""
+        result = self.get_metadata_batch([link], timeout)[link]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def metadata_cmd(self, links, fmt="bestaudio"):
+        """yt-dlp command that dumps info JSON for every link, one per line
+
+        fmt is the format selector the link will be downloaded with, so the
+        reported size is that of the chosen format(s).
+        """
+        return [
+            "yt-dlp",
+            "--no-warnings",
+            "--no-playlist",
+            "--ignore-errors",
+            "--dump-json",
+            "-f",
+            fmt,
+            *links,
+        ]
+
+    def parse_metadata(self, output, links, missing=None):
+        """Match --dump-json lines back to their links by video ID
+
+        Returns {link: info dict or exception}; links without a line get
+        `missing` (or a LookupError) as their result.
+        """
+        by_key = {link_key(link): link for link in links}
+        results = {}
+        for line in output.splitlines():
+            try:
+                info = json.loads(line)
+            except ValueError:
+                continue
+            for candidate in (info.get("id"), info.get("original_url")):
+                link = by_key.get(link_key(candidate)) if candidate else None
+                if link:
+                    results[link] = info
+                    break
+
+        for link in links:
+            if link not in results:
+                results[link] = missing or LookupError(f"no metadata for {link}")
+        return results
+
+    def get_metadata_batch(self, links, timeout=METADATA_TIMEOUT, fmt="bestaudio"):
+        """Resolve many links with a single yt-dlp process
+
+        Returns {link: info dict or exception}. --ignore-errors keeps one bad
+        URL from failing the whole batch.
+        """
+        missing = None
+        with self.span("ytdlp_metadata") as span:
+            try:
+                result = subprocess.run(
+                    self.metadata_cmd(links, fmt),
+                    capture_output=True,
+                    text=True,
+                    timeout=timeout,
+                    creationflags=CREATE_NO_WINDOW,
+                )
+                output = result.stdout
+                span["result"] = str(result.returncode)
+            except subprocess.TimeoutExpired as e:
+                # Keep whatever was resolved before the timeout
+                output = e.stdout or ""
+                if isinstance(output, bytes):
+                    output = output.decode("utf-8", "replace")
+                missing = TimeoutError(f"yt-dlp timed out after {timeout}s")
+                span["result"] = "timeout"
+            span["bytes"] = len(output)
+
+        return self.parse_metadata(output, links, missing)
+
+    def expand_playlist(self, url, start=1):
+        """Yield the flat entries of a playlist or channel, starting at start
+
+        Entries stream out of one yt-dlp process as it pages through the
+        list; closing the generator early kills the process.
+        """
+        process = subprocess.Popen(
+            [
+                "yt-dlp",
+                "--no-warnings",
+                "--flat-playlist",
+                "--dump-json",
+                "--playlist-items",
+                f"{start}:",
+                url,
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            creationflags=CREATE_NO_WINDOW,
+        )
+        try:
+            listed = 0
+            for line in process.stdout:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                listed += 1
+                yield entry
+            if process.wait() != 0 and not listed:
+                raise LookupError(f"could not list {url}")
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+    def download_args(self, download_path, limit=None):
+        """yt-dlp options shared by audio and video downloads"""
+        rate = ["--limit-rate", str(int(limit))] if limit else []
+        return [
+            *rate,
+            "-P",
+            download_path,
+            "-o",
+            OUTPUT_TEMPLATE,
+            "--continue",  # Resume partial downloads
+            "--no-warnings",
+            "--no-playlist",
+            "--quiet",
+            "--progress",
+            "--newline",
+            "--progress-template",
+            PROGRESS_TEMPLATE,
+        ]
+
+    def audio_cmd(self, link, download_path, limit=None):
+        """yt-dlp command that downloads a link's best audio stream as-is"""
+        args = self.download_args(download_path, limit)
+        return ["yt-dlp", "-f", "bestaudio", *args, link]
+
+    def video_cmd(
+        self, link, download_path, selector, container=None, fragments=1, limit=None
+    ):
+        """yt-dlp command that downloads a link as video
+
+        Separate video and audio streams are merged by stream copy; a
+        container only changes the file they are remuxed into.
+        """
+        cmd = ["yt-dlp", "-f", selector, "-N", str(fragments)]
+        if container:
+            cmd += ["--merge-output-format", container]
+        return [*cmd, *self.download_args(download_path, limit), link]
+
+    def parse_progress(self, line):
+        """Turn a PROGRESS_TEMPLATE line into a ProgressEvent (None otherwise)"""
+        fields = line.split()
+        if len(fields) != 8 or fields[0] != PROGRESS_MARKER:
+            return None
+        downloaded, total, estimate, speed, eta, fragment, fragments = map(
+            parse_number, fields[1:]
+        )
+        return ProgressEvent(
+            downloaded, total or estimate, speed, eta, fragment, fragments
+        )
+
+    def download_audio(self, link, download_path, on_progress=None, limit=None):
+        """Download the audio stream, passing ProgressEvents to on_progress
+
+        limit caps the transfer rate in bytes/s (None = unlimited).
+        """
+        cmd = self.audio_cmd(link, download_path, limit)
+        return self.run_download(cmd, on_progress)
+
+    def download_video(
+        self, link, download_path, on_progress=None, selector=None, **options
+    ):
+        """Download and merge video, passing ProgressEvents to on_progress"""
+        cmd = self.video_cmd(
+            link, download_path, selector or DEFAULT_VIDEO_FORMAT, **options
+        )
+        return self.run_download(cmd, on_progress)
+
+    def run_download(self, cmd, on_progress=None):
+        """Run a yt-dlp download command, raising DownloadFailed on failure"""
+        error = None
+        with self.span("ytdlp_download") as span:
+            process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1,
+                universal_newlines=True,
+                creationflags=CREATE_NO_WINDOW,
+            )
+
+            for line in process.stdout:
+                event = self.parse_progress(line)
+                if event and on_progress:
+                    on_progress(event)
+                elif line.startswith("ERROR:"):
+                    error = line.strip()
+
+            process.wait()
+            span["result"] = str(process.returncode)
+        if process.returncode:
+            if killed_by_signal(process.returncode):
+                raise DownloadInterrupted(f"yt-dlp exited with {process.returncode}")
+            raise DownloadFailed(error or f"yt-dlp exited with {process.returncode}")
+        return True
+
+
+class AsyncioEngine(SubprocessEngine):
+    """Subprocess engine whose lookups and downloads share one event loop
+
+    Children are started with asyncio.create_subprocess_exec, so the
+    progress streams of many downloads and the metadata batches can be read
+    concurrently from a single thread. Cancelling a coroutine kills its
+    child process. The blocking methods are inherited for the code paths
+    that don't run on the loop.
+    """
+
+    name = "asyncio"
+
+    async def _kill(self, process):
+        """Stop a child that is still running when its task ends"""
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await process.wait()
+
+    async def get_metadata_batch_async(
+        self, links, timeout=METADATA_TIMEOUT, fmt="bestaudio"
+    ):
+        """Resolve many links with one yt-dlp child without blocking the loop"""
+        import asyncio
+
+        process = await asyncio.create_subprocess_exec(
+            *self.metadata_cmd(links, fmt),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            creationflags=CREATE_NO_WINDOW,
+        )
+        lines = []
+        missing = None
+
+        async def read():
+            async for raw in process.stdout:
+                lines.append(raw.decode("utf-8", "replace"))
+
+        with self.span("ytdlp_metadata") as span:
+            try:
+                await asyncio.wait_for(read(), timeout)
+                span["result"] = str(await process.wait())
+            except asyncio.TimeoutError:
+                # Keep whatever was resolved before the timeout
+                missing = TimeoutError(f"yt-dlp timed out after {timeout}s")
+                span["result"] = "timeout"
+            finally:
+                await self._kill(process)
+            span["bytes"] = sum(len(line) for line in lines)
+
+        return self.parse_metadata("".join(lines), links, missing)
+
+    async def download_audio_async(
+        self, link, download_path, on_progress=None, limit=None
+    ):
+        """Download the audio stream, passing ProgressEvents to on_progress"""
+        cmd = self.audio_cmd(link, download_path, limit)
+        return await self.run_download_async(cmd, on_progress)
+
+    async def download_video_async(
+        self, link, download_path, on_progress=None, selector=None, **options
+    ):
+        """Download and merge video, passing ProgressEvents to on_progress"""
+        cmd = self.video_cmd(
+            link, download_path, selector or DEFAULT_VIDEO_FORMAT, **options
+        )
+        return await self.run_download_async(cmd, on_progress)
+
+    async def run_download_async(self, cmd, on_progress=None):
+        """Run a yt-dlp download command on the loop (DownloadFailed on failure)"""
+        import asyncio
+
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            creationflags=CREATE_NO_WINDOW,
+        )
+        error = None
+        with self.span("ytdlp_download") as span:
+            try:
+                async for raw in process.stdout:
+                    line = raw.decode("utf-8", "replace")
+                    event = self.parse_progress(line)
+                    if event and on_progress:
+                        on_progress(event)
+                    elif line.startswith("ERROR:"):
+                        error = line.strip()
+                span["result"] = str(await process.wait())
+            finally:
+                await self._kill(process)
+        if process.returncode:
+            if killed_by_signal(process.returncode):
+                raise DownloadInterrupted(f"yt-dlp exited with {process.returncode}")
+            raise DownloadFailed(error or f"yt-dlp exited with {process.returncode}")
+        return True
+
+
+class InProcessEngine:
+    """yt-dlp backend that drives the yt_dlp.YoutubeDL API in this process
+
+    Each worker thread keeps its own long-lived YoutubeDL instances (they are
+    not thread-safe), so HTTP connections and extractor state are reused
+    across links instead of being rebuilt by a new process every time.
+    """
+
+    name = "inprocess"
+    # Set by YTDawn on Ctrl+C; downloads in worker threads stop at their next
+    # progress update, as they don't get the signal a child process would
+    stopping = None
+
+    def __init__(self):
+        import yt_dlp  # Raises ImportError when the package is missing
+
+        self.yt_dlp = yt_dlp
+        self._local = threading.local()
+
+    def version(self):
+        """Return the yt_dlp package version"""
+        return self.yt_dlp.version.__version__
+
+    def probe(self, cache_file):
+        """The package imported fine, so there is nothing to check"""
+        return self.version()
+
+    def _instance(self, key, params):
+        """Get this thread's cached YoutubeDL for key, creating it once"""
+        instances = self._local.__dict__.setdefault("instances", {})
+        if key not in instances:
+            base = {
+                "quiet": True,
+                "no_warnings": True,
+                "noplaylist": True,
+                "noprogress": True,
+            }
+            base.update(params)
+            instances[key] = self.yt_dlp.YoutubeDL(base)
+        return instances[key]
+
+    def _extract(self, link, timeout, fmt="bestaudio"):
+        """Resolve info for a link and format selector without downloading"""
+        ydl = self._instance(
+            f"metadata {fmt}", {"format": fmt, "socket_timeout": timeout}
+        )
+        try:
+            return ydl.sanitize_info(ydl.extract_info(link, download=False))
+        except self.yt_dlp.utils.DownloadError as e:
+            if "timed out" in str(e).lower():
+                raise TimeoutError(str(e))
+            raise
+
+    def get_metadata(self, link, timeout=METADATA_TIMEOUT):
+        """Fetch the full info dict for the best audio format"""
+        return self._extract(link, timeout)
+
+    def get_metadata_batch(self, links, timeout=METADATA_TIMEOUT, fmt="bestaudio"):
+        """Resolve many links on this thread's shared YoutubeDL instance"""
+        results = {}
+        for link in links:
+            try:
+                results[link] = self._extract(link, timeout, fmt)
+            except Exception as e:
+                results[link] = e
+        return results
+
+    def expand_playlist(self, url, start=1):
+        """Yield the flat entries of a playlist or channel, starting at start
+
+        With process=False and lazy_playlist the extractor pages through the
+        list only as far as entries are consumed.
+        """
+        ydl = self._instance(
+            "playlist",
+            {"extract_flat": "in_playlist", "lazy_playlist": True, "noplaylist": False},
+        )
+        info = ydl.extract_info(url, download=False, process=False)
+        yield from itertools.islice(info.get("entries") or [], start - 1, None)
+
+    def _progress_hook(self, job, d):
+        """Forward yt-dlp progress hook events to the current job's callback"""
+        if self.stopping is not None and self.stopping.is_set():
+            raise self.yt_dlp.utils.DownloadCancelled()
+        on_progress = job.get("on_progress")
+        if not on_progress or d.get("status") != "downloading":
+            return
+
+        on_progress(
+            ProgressEvent(
+                d.get("downloaded_bytes"),
+                d.get("total_bytes") or d.get("total_bytes_estimate"),
+                d.get("speed"),
+                d.get("eta"),
+                d.get("fragment_index"),
+                d.get("fragment_count"),
+            )
+        )
+
+    def _downloader(self, key, params):
+        """This thread's cached downloading YoutubeDL for key, and its job slot
+
+        yt-dlp also calls progress hooks from its fragment download threads,
+        so the hook finds the running job's callback in the slot of its
+        instance (which runs one download at a time), not in thread-local
+        state.
+        """
+        downloaders = self._local.__dict__.setdefault("downloaders", {})
+        if key not in downloaders:
+            job = {}
+            params = {
+                "outtmpl": {"default": OUTPUT_TEMPLATE},
+                "continuedl": True,  # Resume partial downloads
+                "progress_hooks": [functools.partial(self._progress_hook, job)],
+                **params,
+            }
+            downloaders[key] = self._instance(key, params), job
+        return downloaders[key]
+
+    def download_audio(self, link, download_path, on_progress=None, limit=None):
+        """Download the audio stream, passing ProgressEvents to on_progress"""
+        ydl, job = self._downloader("audio", {"format": "bestaudio"})
+        return self._download(ydl, job, link, download_path, on_progress, limit)
+
+    def download_video(
+        self,
+        link,
+        download_path,
+        on_progress=None,
+        selector=None,
+        container=None,
+        fragments=1,
+        limit=None,
+    ):
+        """Download and merge video, passing ProgressEvents to on_progress"""
+        selector = selector or DEFAULT_VIDEO_FORMAT
+        ydl, job = self._downloader(
+            ("video", selector, container, fragments),
+            {
+                "format": selector,
+                "merge_output_format": container,
+                "concurrent_fragment_downloads": fragments,
+            },
+        )
+        return self._download(ydl, job, link, download_path, on_progress, limit)
+
+    def _download(self, ydl, job, link, download_path, on_progress, limit):
+        """Run one download on a cached instance, reporting to on_progress
+
+        The folder and rate limit are read from params on every download,
+        so they are set per job instead of creating an instance for each.
+        """
+        ydl.params.update(paths={"home": download_path}, ratelimit=limit)
+        job["on_progress"] = on_progress
+        try:
+            return ydl.download([link]) == 0
+        except self.yt_dlp.utils.DownloadCancelled as e:
+            raise DownloadInterrupted(str(e)) from e
+        except self.yt_dlp.utils.DownloadError as e:
+            raise DownloadFailed(str(e)) from e
+        finally:
+            job.clear()
+
+
+class DownloadFailed(Exception):
+    """A download that yt-dlp reported as failed, with its error message"""
+
+
+class DownloadInterrupted(Exception):
+    """A download whose yt-dlp was stopped by a signal (e.g. Ctrl+C)"""
+
+
+def killed_by_signal(returncode):
+    """Whether a child exit code means it was stopped by a signal
+
+    Negative on POSIX, 130 from shells and wrappers after SIGINT, and
+    STATUS_CONTROL_C_EXIT on Windows.
+    """
+    return returncode is not None and (
+        returncode < 0 or returncode in (130, 0xC000013A)
+    )
+
+
+def classify_failure(error):
+    """Cause of a failed download: a RETRY_POLICY key"""
+    if type(error).__name__ == "TimeoutError":  # Also asyncio's before 3.11
+        return "timeout"
+    message = str(error).lower()
+    for kind, snippets in FAILURE_PATTERNS:
+        if any(snippet in message for snippet in snippets):
+            return kind
+    return "error"
+
+
+def retry_delay(kind, attempts):
+    """Seconds until a retry after `attempts` failures (None = give up)"""
+    import random
+
+    base, limit = RETRY_POLICY[kind]
+    if attempts >= limit:
+        return None
+    delay = min(base * 2 ** (attempts - 1), RETRY_MAX)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def link_status(item):
+    """Status icon of a record: downloaded, given up on, or pending"""
+    if item.get("is_downloaded", False):
+        return "✅"
+    return "❌" if item.get("failed") else "⏳"
+
+
+def remaining_bytes(job):
+    """Bytes a pending job still has to fetch (its size if nothing is on disk)"""
+    return max((job["filesize"] or 0) - job.get("on_disk", 0), 0)
+
+
+def resume_rank(job):
+    """Sort key that puts interrupted downloads first, fewest bytes left first"""
+    if job.get("on_disk"):
+        return 0, remaining_bytes(job)
+    return 1, 0
+
+
+def parse_number(field):
+    """A number from a progress template field, None for NA/None"""
+    try:
+        return float(field)
+    except ValueError:
+        return None
+
+
+class ProgressEvent(
+    namedtuple("ProgressEvent", "downloaded total speed eta fragment fragments")
+):
+    """One progress sample of a download
+
+    Bytes downloaded and expected in total, speed in bytes per second, ETA
+    in seconds and the current/total fragment for fragmented formats. Any
+    of them can be None when yt-dlp doesn't know it (yet).
+    """
+
+    __slots__ = ()
+
+    @property
+    def percent(self):
+        if not self.total:
+            return 0.0
+        return min(100.0 * (self.downloaded or 0) / self.total, 100.0)
+
+
+def format_rate(bytes_per_sec):
+    """Format a transfer rate in MiB/s"""
+    return f"{bytes_per_sec / (1024 * 1024):.1f} MiB/s"
+
+
+def format_eta(seconds):
+    """Format seconds as MM:SS (or H:MM:SS)"""
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+
+class Transcoder:
+    """Post-processing stage converting downloaded audio streams with ffmpeg
+
+    submit() queues a conversion on a pool with one worker per CPU core,
+    each driving one ffmpeg process, so conversions overlap with the
+    downloads still running instead of holding up a download slot. Streams
+    already in the target codec are only remuxed (-c:a copy).
+    """
+
+    def __init__(self, workers=None, metrics=None):
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.pool = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+        self.metrics = metrics
+        self.lock = threading.Lock()
+        self.pending = 0  # Conversions queued or running
+
+    def submit(self, source_dir, target_dir, fmt, on_done=None):
+        """Queue a conversion, returning a future of (path, "copied"/"converted")
+
+        on_done(result, error) runs on the worker before the future
+        completes, so whoever waits for the future waits for it too.
+        """
+        with self.lock:
+            self.pending += 1
+        return self.pool.submit(self._run, source_dir, target_dir, fmt, on_done)
+
+    def _run(self, source_dir, target_dir, fmt, on_done=None):
+        span = self.metrics.span("transcode") if self.metrics else nullcontext({})
+        try:
+            try:
+                with span as span:
+                    span["result"] = "failed"
+                    path, span["result"] = self.convert(source_dir, target_dir, fmt)
+                    span["bytes"] = os.path.getsize(path)
+            except Exception as e:
+                if on_done:
+                    on_done(None, e)
+                raise
+            if on_done:
+                on_done((path, span["result"]), None)
+            return path, span["result"]
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+    def probe_codec(self, path):
+        """Codec name of a file's first audio stream (None if unknown)"""
+        try:
+            result = subprocess.run(
+                [
+                    "ffprobe",
+                    "-v",
+                    "error",
+                    "-select_streams",
+                    "a:0",
+                    "-show_entries",
+                    "stream=codec_name",
+                    "-of",
+                    "csv=p=0",
+                    path,
+                ],
+                capture_output=True,
+                text=True,
+                creationflags=CREATE_NO_WINDOW,
+            )
+        except OSError:
+            return None
+        return result.stdout.strip() or None
+
+    def convert(self, source_dir, target_dir, fmt):
+        """Convert the stream downloaded into source_dir to fmt in target_dir
+
+        The result is written under a temporary name and moved into place,
+        then source_dir is removed. Raises on ffmpeg errors.
+        """
+        sources = [
+            entry.path
+            for entry in os.scandir(source_dir)
+            if entry.is_file() and not entry.name.endswith(FileIndex.partial_suffixes)
+        ]
+        if not sources:
+            raise FileNotFoundError(f"No downloaded stream in {source_dir}")
+        source = max(sources, key=os.path.getmtime)
+
+        ext, codec, muxer, encode = AUDIO_FORMATS.get(fmt, AUDIO_FORMATS["opus"])
+        copy = self.probe_codec(source) == codec
+        target = Path(target_dir) / f"{Path(source).stem}.{ext}"
+        tmp_file = target.with_name(target.name + ".part")
+        subprocess.run(
+            [
+                "ffmpeg",
+                "-nostdin",
+                "-loglevel",
+                "error",
+                "-y",
+                "-i",
+                source,
+                "-vn",
+                *(["-c:a", "copy"] if copy else encode),
+                "-f",
+                muxer,
+                str(tmp_file),
+            ],
+            check=True,
+            capture_output=True,
+            creationflags=CREATE_NO_WINDOW,
+        )
+        os.replace(tmp_file, target)
+        shutil.rmtree(source_dir, ignore_errors=True)
+        return str(target), "copied" if copy else "converted"
+
+
+def parse_rate(value):
+    """Bytes/s from a number or a yt-dlp style rate ("500K", "4M", "1.5MiB")"""
+    if isinstance(value, (int, float)):
+        return value
+    match = re.fullmatch(r"\s*([\d.]+)\s*([kmg]?)(?:i?b)?\s*", str(value), re.I)
+    if not match:
+        raise ValueError(f"invalid rate: {value!r}")
+    return float(match.group(1)) * 1024 ** " kmg".index(match.group(2).lower() or " ")
+
+
+class BandwidthLimiter:
+    """Splits a global download rate budget between the running jobs
+
+    yt-dlp fixes a download's rate cap when it starts, so each job gets an
+    equal share of the budget the running jobs don't already hold, divided
+    by the job slots that will still be filled (free slots, or fewer when
+    fewer jobs are waiting). The shares never add up to more than the
+    budget: a job that would get less than a quarter of an equal share
+    waits until a running job finishes and its share goes back to the
+    pool. The budget is read from rate() at every start, so time-of-day
+    profiles apply from the next job on.
+    """
+
+    def __init__(self, rate, jobs, waiting=0):
+        self.rate = rate
+        self.jobs = jobs
+        self.waiting = waiting  # Jobs queued but not started yet
+        self.shares = {}  # key -> bytes/s held by a running job
+        self.lock = threading.Lock()
+        self.released = threading.Condition(self.lock)
+
+    def add(self, count=1):
+        """Count jobs queued after the limiter was created"""
+        with self.lock:
+            self.waiting += count
+
+    def acquire(self, key, wait=True):
+        """Reserve a share for a starting job, return its cap (None = none)
+
+        Blocks while the running jobs hold the budget; with wait=False
+        returns False instead.
+        """
+        with self.released:
+            while True:
+                rate = self.rate()
+                if not rate:
+                    self.waiting = max(self.waiting - 1, 0)
+                    return None
+                free = max(rate - sum(self.shares.values()), 0)
+                least = min(max(rate / self.jobs / 4, 1024), rate)
+                if free >= least:
+                    break
+                if not wait:
+                    return False
+                # Re-read the budget now and then, it may have grown
+                self.released.wait(1)
+
+            self.waiting = max(self.waiting - 1, 0)
+            slots = max(min(self.jobs - len(self.shares), self.waiting + 1), 1)
+            share = min(max(free / slots, least), free)
+            self.shares[key] = share
+            return share
+
+    async def acquire_async(self, key):
+        """acquire() for the event loop, which the releases also run on"""
+        import asyncio
+
+        while True:
+            share = self.acquire(key, wait=False)
+            if share is not False:
+                return share
+            await asyncio.sleep(0.1)
+
+    def release(self, key):
+        with self.released:
+            self.shares.pop(key, None)
+            self.released.notify_all()
+
+
+def video_format(fmt="", max_height=None):
+    """(yt-dlp format selector, merge container) for a video record's format
+
+    The format field holds a height cap ("720p", "1080"), a container
+    ("mp4", "mkv", "webm", "mov"), both ("720p mp4"), or a yt-dlp format
+    selector that is used as-is. max_height caps records without their own.
+    """
+    words = (fmt or "").lower().split()
+    if not all(w in VIDEO_CONTAINERS or re.fullmatch(r"\d+p?", w) for w in words):
+        return fmt, None
+
+    height, container = max_height, None
+    for word in words:
+        if word in VIDEO_CONTAINERS:
+            container = word
+        else:
+            height = int(word.rstrip("p"))
+    if not height:
+        return DEFAULT_VIDEO_FORMAT, container
+    cap = f"[height<={height}]"
+    return f"bestvideo*{cap}+bestaudio/best{cap}", container
+
+
+class Metrics:
+    """Count, time and size of named spans, exportable as JSON or Prometheus
+
+    Each span records its duration, the bytes it handled and a result label
+    (an exit code, "ok", "failed", ...). Thread-safe, so download workers
+    can record into the same instance.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.spans = {}
+        self.transferred = 0  # Bytes seen in progress events
+        self.progress = {}  # key -> bytes downloaded so far
+
+    @contextmanager
+    def span(self, name):
+        """Time the with-block; set "bytes" and "result" on the yielded dict"""
+        record = {"bytes": 0, "result": "ok"}
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException:
+            record["result"] = "error"
+            raise
+        finally:
+            self.add(
+                name, time.perf_counter() - start, record["bytes"], record["result"]
+            )
+
+    def add(self, name, seconds, size=0, result="ok"):
+        with self.lock:
+            span = self.spans.setdefault(
+                name, {"count": 0, "seconds": 0.0, "max_seconds": 0.0, "bytes": 0}
+            )
+            span["count"] += 1
+            span["seconds"] += seconds
+            span["max_seconds"] = max(span["max_seconds"], seconds)
+            span["bytes"] += size or 0
+            results = span.setdefault("results", {})
+            results[result] = results.get(result, 0) + 1
+
+    def on_progress(self, key, event):
+        """Progress listener: count bytes transferred across all downloads"""
+        downloaded = int(event.downloaded or 0)
+        with self.lock:
+            previous = self.progress.get(key, 0)
+            # A restarted download (or new fragment file) starts over
+            self.transferred += downloaded - previous if downloaded >= previous else 0
+            self.progress[key] = downloaded
+
+    def summary(self):
+        """Snapshot of every span, plus the run's start time and duration"""
+        with self.lock:
+            return {
+                "started": self.started,
+                "elapsed": time.time() - self.started,
+                "transferred_bytes": self.transferred,
+                "spans": json.loads(json.dumps(self.spans)),
+            }
+
+    def prometheus(self):
+        """The spans in Prometheus text exposition format"""
+        summary = self.summary()
+        lines = []
+        metrics = (
+            ("seconds_total", "counter", "Time spent in the span", "seconds"),
+            ("max_seconds", "gauge", "Longest single span", "max_seconds"),
+            ("bytes_total", "counter", "Bytes handled by the span", "bytes"),
+        )
+        for suffix, kind, help_text, field in metrics:
+            lines.append(f"# HELP ytdawn_span_{suffix} {help_text}")
+            lines.append(f"# TYPE ytdawn_span_{suffix} {kind}")
+            for name, span in summary["spans"].items():
+                lines.append(f'ytdawn_span_{suffix}{{span="{name}"}} {span[field]}')
+
+        lines.append("# HELP ytdawn_transferred_bytes_total Bytes downloaded so far")
+        lines.append("# TYPE ytdawn_transferred_bytes_total counter")
+        lines.append(f"ytdawn_transferred_bytes_total {summary['transferred_bytes']}")
+
+        lines.append("# HELP ytdawn_span_count_total Spans finished, by result")
+        lines.append("# TYPE ytdawn_span_count_total counter")
+        for name, span in summary["spans"].items():
+            for result, count in span["results"].items():
+                lines.append(
+                    f'ytdawn_span_count_total{{span="{name}",result="{result}"}} {count}'
+                )
+        return "\n".join(lines) + "\n"
+
+    def write(self, json_file):
+        """Write the JSON summary and a .prom textfile next to it, atomically"""
+        json_file = Path(json_file)
+        outputs = (
+            (json_file, json.dumps(self.summary(), indent=2)),
+            (json_file.with_suffix(".prom"), self.prometheus()),
+        )
+        for path, text in outputs:
+            tmp_file = path.with_name(path.name + ".tmp")
+            tmp_file.write_text(text, encoding="utf-8")
+            os.replace(tmp_file, path)
+
+
+class EventStream:
+    """Lifecycle events written as NDJSON, one JSON object per line
+
+    Every line has "event" and "time" plus the event's fields. Progress is
+    rate-limited to one event per download every `progress_interval`
+    seconds (and the final 100%). The queued/completed/failed counts and
+    completed bytes since the last batch-summary are tallied for it.
+    """
+
+    def __init__(self, out, progress_interval=1.0):
+        self.out = out
+        self.progress_interval = progress_interval
+        self.lock = threading.Lock()
+        self.progress_at = {}  # link -> time of its last progress event
+        self.tally = self._new_tally()
+
+    def _new_tally(self):
+        return {"queued": 0, "completed": 0, "failed": 0, "bytes": 0}
+
+    def emit(self, event, **fields):
+        record = {"event": event, "time": round(time.time(), 3), **fields}
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.lock:
+            if event in self.tally:
+                self.tally[event] += 1
+            if event == "completed":
+                self.tally["bytes"] += fields.get("filesize") or 0
+            self.out.write(line)
+            self.out.flush()
+
+    def progress(self, link, event):
+        """Progress listener: emit a rate-limited "progress" event"""
+        now = time.monotonic()
+        with self.lock:
+            last = self.progress_at.get(link, 0.0)
+            if event.percent < 100 and now - last < self.progress_interval:
+                return
+            self.progress_at[link] = now
+        self.emit(
+            "progress",
+            link=link,
+            percent=round(event.percent, 1),
+            **event._asdict(),
+        )
+
+    def summary(self, **fields):
+        """Emit "batch-summary" with the tallies since the previous one"""
+        with self.lock:
+            tally, self.tally = self.tally, self._new_tally()
+            self.progress_at.clear()
+        self.emit("batch-summary", **tally, **fields)
+
+
+class ProgressBoard:
+    """Multi-line console progress for parallel downloads
+
+    Draws one row per active job plus an aggregate throughput/ETA line and
+    redraws the block in place, at most every PROGRESS_REFRESH seconds for
+    progress updates. Finished jobs are printed once above it. When stdout
+    is not a terminal only the finished lines are printed.
+    """
+
+    bar_length = 20
+    title_length = 30
+
+    def __init__(self, total_files, total_bytes):
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.done_files = 0
+        self.done_bytes = 0
+        self.active = {}  # key -> [title, size, percent, speed]
+        self.converting = 0  # Downloaded, waiting for or in conversion
+        self.lock = threading.Lock()
+        self.drawn = 0
+        self.drawn_at = 0.0
+        self.live = sys.stdout.isatty()
+        if self.live and os.name == "nt":
+            os.system("")  # Enable ANSI escape sequences in the Windows console
+
+    def _short(self, title):
+        if len(title) > self.title_length:
+            return title[: self.title_length - 3] + "..."
+        return title
+
+    def add_total(self, files, size):
+        """Grow the totals when jobs are queued while others already run"""
+        with self.lock:
+            self.total_files += files
+            self.total_bytes += size or 0
+            self._draw()
+
+    def log(self, line):
+        """Print a permanent line above the live block"""
+        with self.lock:
+            self._clear()
+            print(line)
+            self._draw()
+
+    def start(self, key, title, size):
+        with self.lock:
+            self.active[key] = [title, size or 0, 0.0, 0.0]
+            self._draw()
+
+    def update(self, key, event):
+        with self.lock:
+            row = self.active.get(key)
+            if row is None:
+                return
+            row[1] = row[1] or event.total or 0
+            row[2] = event.percent
+            row[3] = event.speed or 0.0
+            if time.monotonic() - self.drawn_at >= PROGRESS_REFRESH:
+                self._draw()
+
+    def finish(self, key, success, convert=False):
+        """End a download; with convert it waits for convert_finish()"""
+        with self.lock:
+            title, size, _, _ = self.active.pop(key, [key, 0, 0.0, 0.0])
+            self.done_files += 1
+            self.done_bytes += size
+            if success and convert:
+                self.converting += 1
+                self._draw()
+                return
+            self._clear()
+            status = "Completed" if success else "Failed"
+            print(f"{'✅' if success else '❌'} {self._short(title):<30} {status}")
+            self._draw()
+
+    def skip(self, title, size, reason):
+        """Drop a queued job that won't run here from the totals"""
+        with self.lock:
+            self.total_files -= 1
+            self.total_bytes -= size or 0
+            self._clear()
+            print(f"⏭ {self._short(title):<30} {reason}")
+            self._draw()
+
+    def convert_finish(self, title, success):
+        with self.lock:
+            self.converting -= 1
+            self._clear()
+            status = "Completed" if success else "Conversion failed"
+            print(f"{'✅' if success else '❌'} {self._short(title):<30} {status}")
+            self._draw()
+
+    def close(self):
+        with self.lock:
+            self._clear()
+
+    def _clear(self):
+        """Erase the live block so regular lines can be printed"""
+        if self.drawn:
+            print(f"\x1b[{self.drawn}F\x1b[J", end="", flush=True)
+            self.drawn = 0
+
+    def _draw(self):
+        if not self.live:
+            return
+        self._clear()
+        self.drawn_at = time.monotonic()
+
+        lines = []
+        in_flight = 0
+        speed_total = 0.0
+        for title, size, percent, speed in self.active.values():
+            filled = int(self.bar_length * percent / 100)
+            bar = "█" * filled + "░" * (self.bar_length - filled)
+            lines.append(
+                f"▶ {self._short(title):<30} [{bar}] {percent:5.1f}%"
+                + (f" @ {format_rate(speed)}" if speed else "")
+            )
+            in_flight += size * percent / 100
+            speed_total += speed
+
+        remaining = max(self.total_bytes - self.done_bytes - in_flight, 0)
+        eta = format_eta(remaining / speed_total) if speed_total else "--:--"
+        queued = self.total_files - self.done_files - len(self.active)
+        lines.append(
+            f"Total: {self.done_files}/{self.total_files} files | "
+            f"{queued} queued | {len(self.active)} active | "
+            f"{self.converting} converting | {format_rate(speed_total)} | ETA {eta}"
+        )
+
+        print("\n".join(lines), flush=True)
+        self.drawn = len(lines)
+
+
+# youtu.be/<id>, watch?v=<id>, /shorts/<id>, /embed/<id>, /live/<id>, /v/<id>
+VIDEO_ID_PATTERNS = [
+    re.compile(r"youtu\.be/([\w-]+)"),
+    re.compile(r"[?&]v=([\w-]+)"),
+    re.compile(r"youtube\.com/(?:shorts|embed|live|v)/([\w-]+)"),
+]
+
+
+def extract_video_id(link):
+    """Return the YouTube video ID of a link, or None if it has none"""
+    for pattern in VIDEO_ID_PATTERNS:
+        match = pattern.search(link)
+        if match:
+            return match.group(1)
+    return None
+
+
+def link_key(link):
+    """Canonical lookup key for a link: its video ID, else the trimmed URL"""
+    link = link.strip()
+    return extract_video_id(link) or link
+
+
+def metadata_key(link, fmt="bestaudio"):
+    """Metadata cache key: the link key, plus the format selector for video"""
+    key = link_key(link)
+    return key if fmt == "bestaudio" else f"{key} {fmt}"
+
+
+CHANNEL_PATTERN = re.compile(r"youtube\.com/(?:@|channel/|c/|user/)[^/?#]+/?$")
+
+
+def video_partials(link, groups):
+    """Keys of FileIndex.partials()["video"] groups a video link owns
+
+    yt-dlp names the files by the extractor's ID: extract_video_id() for
+    YouTube, for other sites an ID that is usually part of the URL.
+    """
+    video_id = extract_video_id(link)
+    if video_id:
+        return [video_id] if video_id in groups else []
+    return [key for key in groups if key in link]
+
+
+def collection_kind(link):
+    """ "playlist" or "channel" for a link listing many videos, else None
+
+    A watch URL with a list= parameter is still one video, matching
+    --no-playlist everywhere else.
+    """
+    link = link.strip()
+    if extract_video_id(link):
+        return None
+    if re.search(r"[?&]list=", link):
+        return "playlist"
+    if re.search(r"youtube\.com/(?:@|channel/|c/|user/)", link):
+        return "channel"
+    return None
+
+
+def create_engine(name="auto"):
+    """Create a yt-dlp engine, falling back to subprocess when needed"""
+    if name == "asyncio":
+        return AsyncioEngine()
+    if name in ("auto", "inprocess"):
+        try:
+            return InProcessEngine()
+        except ImportError:
+            if name == "inprocess":
+                print("⚠️  yt_dlp module not importable, using subprocess engine")
+    return SubprocessEngine()
+
+
+class MetadataCache:
+    """Persistent cache of resolved video metadata, keyed by metadata_key()
+
+    Keeps the useful --dump-json fields (title, duration, size of the chosen
+    format(s) and of every format, thumbnail URL) for `ttl` seconds. Failed
+    lookups are cached too and retried with exponential backoff, so a
+    timing-out link is not re-resolved on every pass. The least recently
+    used entries are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, cache_file, ttl=DEFAULT_METADATA_TTL, max_entries=None):
+        self.cache_file = Path(cache_file)
+        self.ttl = ttl
+        self.max_entries = max_entries or DEFAULT_METADATA_CACHE_SIZE
+        self.entries = OrderedDict()
+        self.dirty = False
+        self._lock = threading.Lock()
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                self.entries.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+
+    def get(self, key):
+        """Return a fresh entry (or a failure still in backoff), else None"""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+
+            now = time.time()
+            if "error" in entry:
+                delay = min(
+                    METADATA_RETRY_BASE * 2 ** (entry["failures"] - 1),
+                    METADATA_RETRY_MAX,
+                )
+                if now - entry["fetched"] >= delay:
+                    return None  # Backoff is over - allowed to retry
+            elif now - entry["fetched"] >= self.ttl:
+                return None
+
+            self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, info):
+        """Store the useful fields of a yt-dlp info dict
+
+        A video+audio selection is sized as the sum of its requested formats.
+        """
+
+        def size(f):
+            return f.get("filesize") or f.get("filesize_approx") or 0
+
+        requested = info.get("requested_formats")
+        entry = {
+            "fetched": time.time(),
+            "title": info.get("title", ""),
+            "duration": info.get("duration") or 0,
+            "filesize": sum(map(size, requested)) if requested else size(info),
+            "formats": {
+                f["format_id"]: size(f)
+                for f in info.get("formats") or []
+                if f.get("format_id")
+            },
+            "thumbnail": info.get("thumbnail", ""),
+        }
+        self._store(key, entry)
+        return entry
+
+    def put_failure(self, key, error):
+        """Remember a failed lookup so it is retried only after a backoff"""
+        with self._lock:
+            previous = self.entries.get(key) or {}
+        entry = {
+            "fetched": time.time(),
+            "error": error,
+            "failures": previous.get("failures", 0) + 1,
+        }
+        self._store(key, entry)
+        return entry
+
+    def _store(self, key, entry):
+        with self._lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.dirty = True
+
+    def save(self):
+        """Write the cache atomically if anything changed"""
+        with self._lock:
+            if not self.dirty:
+                return
+            tmp_file = self.cache_file.with_name(self.cache_file.name + ".tmp")
+            try:
+                with open(tmp_file, "w", encoding="utf-8") as f:
+                    json.dump(self.entries, f, ensure_ascii=False)
+                os.replace(tmp_file, self.cache_file)
+                self.dirty = False
+            except OSError:
+                pass  # The cache is only an optimisation
+
+
+class FileIndex:
+    """Persistent index of downloaded files, keyed by video ID
+
+    Files are named with OUTPUT_TEMPLATE, so the video ID is read from the
+    "[id]" suffix of every finished file. Video containers count as video
+    downloads and everything else as audio, so the same video can be kept
+    both ways in one folder. The listing of each directory is cached with
+    the directory's mtime, and a refresh only rescans directories whose
+    mtime has changed. Files without an ID (older downloads) are matched by
+    their exact normalized title.
+
+    Unfinished downloads are noted too: partial and fragment files and
+    unmerged streams in the folder (video downloads), and the per-link
+    folders under SOURCE_DIR (audio downloads). Their sizes are read fresh
+    by partials(), since they grow between scans.
+    """
+
+    partial_suffixes = (".part", ".ytdl", ".temp", ".tmp")
+    # "...part-Frag12" DASH/HLS fragments and ".temp.mp4" merge output
+    partial_pattern = re.compile(r"\.part-Frag\d+(?:\.part)?$|\.temp\.\w+$")
+    # The last "[id]" in a name, whatever follows it
+    partial_id_pattern = re.compile(r".*\[([\w-]+)\]")
+    video_suffixes = tuple(f".{container}" for container in VIDEO_CONTAINERS)
+    # "Title [id]" with an optional ".f251"-style intermediate format suffix
+    name_pattern = re.compile(r"^(.*?)\s*\[([\w-]+)\](\.f[\w-]+)?$")
+
+    def __init__(self, index_file):
+        self.index_file = Path(index_file)
+        self.dirs = {}  # directory -> {"mtime": ns, "files": {name: id or None}}
+        self.ids = {"audio": set(), "video": set()}
+        self.titles = set()
+        self.lock = threading.Lock()  # Download workers refresh it too
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                self.dirs = json.load(f).get("dirs", {})
+        except (OSError, ValueError):
+            pass
+        self._rebuild()
+
+    def _scan(self, directory):
+        """List a directory's finished and unfinished files
+
+        Returns {"files": {filename: video ID or None}, "partials":
+        {filename: video ID}}.
+        """
+        files = {}
+        partials = {}
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                name = entry.name
+                if name.startswith(".") or not entry.is_file():
+                    continue
+                match = self.name_pattern.match(os.path.splitext(name)[0])
+                # Intermediate streams before merge/extract count as partial
+                if (
+                    name.endswith(self.partial_suffixes)
+                    or self.partial_pattern.search(name)
+                    or (match and match.group(3))
+                ):
+                    match = self.partial_id_pattern.match(name)
+                    if match:
+                        partials[name] = match.group(1)
+                    continue
+                files[name] = match.group(2) if match else None
+        return {"files": files, "partials": partials}
+
+    def _rebuild(self):
+        self.ids = {"audio": set(), "video": set()}
+        self.titles = set()
+        for entry in self.dirs.values():
+            for name, video_id in entry["files"].items():
+                if video_id:
+                    is_video = name.lower().endswith(self.video_suffixes)
+                    self.ids["video" if is_video else "audio"].add(video_id)
+                else:
+                    self.titles.add(os.path.splitext(name)[0].lower().strip())
+
+    def refresh(self, directories):
+        """Rescan the given and already known directories whose mtime changed"""
+        with self.lock:
+            return self._refresh(directories)
+
+    def _refresh(self, directories):
+        changed = False
+        for directory in set(self.dirs) | {str(d) for d in directories}:
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                changed |= self.dirs.pop(directory, None) is not None
+                continue
+            entry = self.dirs.get(directory)
+            # Indexes written before partials were tracked are rescanned once
+            if entry and entry["mtime"] == mtime and "partials" in entry:
+                continue
+            self.dirs[directory] = {"mtime": mtime, **self._scan(directory)}
+            changed = True
+
+        if changed:
+            self._rebuild()
+            self.save()
+        return self
+
+    def save(self):
+        """Write the index atomically next to the catalogue"""
+        tmp_file = self.index_file.with_name(self.index_file.name + ".tmp")
+        try:
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump({"dirs": self.dirs}, f, ensure_ascii=False)
+            os.replace(tmp_file, self.index_file)
+        except OSError:
+            pass  # The index is only a cache
+
+    def has(self, video_id, media_type="audio"):
+        return video_id in self.ids[media_type]
+
+    def partials(self, directory):
+        """Unfinished downloads in a directory, with their current sizes
+
+        Returns {"video": {video ID: [(path, bytes), ...]}, "audio":
+        {source folder name (link_hash): [(path, bytes), ...]}}.
+        """
+        found = {"video": {}, "audio": {}}
+        entry = self.dirs.get(str(directory), {})
+        for name, video_id in entry.get("partials", {}).items():
+            path = os.path.join(directory, name)
+            try:
+                size = os.stat(path).st_size
+            except OSError:
+                continue  # Finished or removed since the scan
+            found["video"].setdefault(video_id, []).append((path, size))
+
+        sources = os.path.join(directory, SOURCE_DIR)
+        try:
+            folders = [e for e in os.scandir(sources) if e.is_dir()]
+        except OSError:
+            folders = []
+        for folder in folders:
+            files = found["audio"][folder.name] = []
+            with os.scandir(folder.path) as entries:
+                for file in entries:
+                    if file.is_file():
+                        files.append((file.path, file.stat().st_size))
+        return found
+
+    def has_title(self, title):
+        return title.lower().strip() in self.titles
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class LinkRecord(MutableMapping):
+    """One catalogue link, a dict-compatible record with fixed slots
+
+    The downloads.json fields live in slots instead of a per-record dict,
+    and any other key (priority, attempts, ...) in a small `extra` dict
+    created only when needed. Paths and formats repeat across thousands of
+    records, so they are interned and shared. Keys missing from the JSON
+    stay missing, so dict(record) gives back exactly what was loaded.
+    """
+
+    fields = ("link", "title", "is_downloaded", "format", "path", "filesize")
+    __slots__ = fields + ("extra",)
+    _field_set = frozenset(fields)
+    _interned = frozenset(("format", "path"))
+    _missing = object()
+
+    def __init__(self, data=None):
+        data = data or {}
+        if data.keys() == self._field_set:
+            # A complete record, the common case: no lookups one by one
+            get = data.__getitem__
+            self.link = get("link")
+            self.title = get("title")
+            self.is_downloaded = get("is_downloaded")
+            self.format = _intern(get("format"))
+            self.path = _intern(get("path"))
+            self.filesize = get("filesize")
+            self.extra = None
+            return
+
+        missing = self._missing
+        present = 0
+        for name in self.fields:
+            value = data.get(name, missing)
+            if value is not missing:
+                present += 1
+                if name in self._interned:
+                    value = _intern(value)
+            setattr(self, name, value)
+        self.extra = None
+        if len(data) > present:
+            self.extra = {k: v for k, v in data.items() if k not in self._field_set}
+
+    @classmethod
+    def convert(cls, items):
+        """Records for a downloads.json links list (non-dict entries kept)"""
+        return [cls(item) if isinstance(item, dict) else item for item in items]
+
+    @classmethod
+    def json_hook(cls, obj):
+        """json.load() object_hook that builds records while parsing
+
+        Each parsed dict is dropped right away instead of the whole list of
+        dicts being held until it is converted.
+        """
+        return cls(obj) if "link" in obj else obj
+
+    def __getitem__(self, key):
+        if key in self._field_set:
+            value = getattr(self, key)
+            if value is not self._missing:
+                return value
+        elif self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in self._field_set:
+            value = getattr(self, key)
+            return default if value is self._missing else value
+        return self.extra.get(key, default) if self.extra else default
+
+    def __contains__(self, key):
+        if key in self._field_set:
+            return getattr(self, key) is not self._missing
+        return bool(self.extra) and key in self.extra
+
+    def __setitem__(self, key, value):
+        if key in self._field_set:
+            if key in self._interned:
+                value = _intern(value)
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        if key in self._field_set:
+            setattr(self, key, self._missing)
+        else:
+            del self.extra[key]
+
+    def __iter__(self):
+        missing = self._missing
+        for name in self.fields:
+            if getattr(self, name) is not missing:
+                yield name
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"LinkRecord({dict(self)!r})"
+
+
+def new_link_record(link, media_type):
+    """Default record for a newly added link"""
+    return {
+        "link": link,
+        "title": "",
+        "is_downloaded": False,
+        "format": "opus" if media_type == "audio" else "",
+        "path": "",
+    }
+
+
+VIDEO_ID = re.compile(r"[\w-]{11}")
+# CSV columns (lowercased) holding the link, or just the video ID
+LINK_COLUMNS = ("link", "url", "webpage_url", "video url")
+ID_COLUMNS = ("video id", "video_id", "id")
+# Record fields taken from CSV columns (others, like timestamps, are dropped)
+CSV_FIELDS = {
+    "title": str,
+    "is_downloaded": lambda v: v.lower() in ("1", "true", "yes"),
+    "format": str,
+    "path": str,
+    "filesize": int,
+    "priority": int,
+}
+
+
+def canonical_link(value):
+    """The URL to store for an imported entry, or None if it isn't one
 
-    def load_json(self):
-        """Load the downloads JSON file or create new one"""
+    Bare video IDs become watch URLs and scheme-less URLs get https://.
+    Playlists and channels are rejected: they need yt-dlp to expand (-aa).
+    """
+    value = (value or "").strip()
+    if VIDEO_ID.fullmatch(value):
+        return f"https://www.youtube.com/watch?v={value}"
+    if re.match(r"(?:www\.|m\.)?(?:youtube\.com|youtu\.be)/", value):
+        value = "https://" + value
+    if not re.match(r"https?://\S+$", value) or collection_kind(value):
+        return None
+    return value
+
+
+def read_import(text, media_type):
+    """Yield (media_type, entry) for every entry of an import file
+
+    Understands a downloads.json export (each link keeps its own media type
+    and fields), a JSON list of URLs or records, CSV with a link/url or
+    video ID column (a header is optional) and one URL per line (blank and
+    # lines are skipped). Entries are str or dict, not validated yet.
+    """
+    stripped = text.lstrip()
+    if stripped.startswith(("{", "[")):
+        data = json.loads(text)
+        if isinstance(data, dict):
+            for kind in ("audio", "video"):
+                for entry in data.get(kind, {}).get("links", []):
+                    yield kind, entry
+        else:
+            for entry in data:
+                yield media_type, entry
+        return
+
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return
+
+    import csv
+
+    rows = csv.reader(lines)
+    first = next(rows)
+    header = [cell.strip().lower() for cell in first]
+    if not any(c in header for c in LINK_COLUMNS + ID_COLUMNS):
+        # A URL list, or CSV without a header: the first cell of every row
+        for row in itertools.chain([first], rows):
+            if row and not row[0].lstrip().startswith("#"):
+                yield media_type, row[0]
+        return
+    for row in rows:
+        yield media_type, csv_entry(dict(zip(header, row)))
+
+
+def csv_entry(row):
+    """Import entry for a CSV row: the link/ID columns and known fields
+
+    CSV cells are strings, so fields are converted to their JSON types;
+    cells that don't convert are dropped like unknown columns.
+    """
+    entry = {}
+    for column, cell in row.items():
+        cell = (cell or "").strip()
+        if not cell:
+            continue
+        if column in LINK_COLUMNS or column in ID_COLUMNS:
+            entry[column] = cell
+        elif column in CSV_FIELDS:
+            try:
+                entry[column] = CSV_FIELDS[column](cell)
+            except ValueError:
+                continue
+    return entry
+
+
+def import_record(entry, media_type):
+    """Catalogue record for an import entry, None if it has no valid link"""
+    if isinstance(entry, str):
+        entry = {"link": entry}
+    elif not isinstance(entry, dict):
+        return None
+
+    value = next((entry[c] for c in LINK_COLUMNS if entry.get(c)), None)
+    if value is None:
+        value = next((entry[c] for c in ID_COLUMNS if entry.get(c)), None)
+    link = canonical_link(value if isinstance(value, str) else None)
+    if link is None:
+        return None
+
+    record = new_link_record(link, media_type)
+    for key, value in entry.items():
+        if key in LINK_COLUMNS or key in ID_COLUMNS or value in ("", None):
+            continue
+        if key == "priority":
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                continue
+        record[key] = value
+    return record
+
+
+@contextmanager
+def file_lock(lock_file):
+    """Hold an exclusive advisory lock on lock_file, across processes
+
+    flock() on POSIX and msvcrt.locking() on Windows; blocks until free.
+    Every process sharing the catalogue takes it around its writes.
+    """
+    with open(lock_file, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK gives up after 10 seconds
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def link_hash(link):
+    """Short stable file name for a link, the same for all its URL forms"""
+    return hashlib.sha1(link_key(link).encode()).hexdigest()[:16]
+
+
+class JsonStore:
+    """Link catalogue kept in downloads.json plus an append-only change journal
+
+    Single-field changes are appended to a JSONL sidecar instead of
+    rewriting the whole document; save() folds them back in atomically.
+    Several processes can share the files: appends and saves hold a file
+    lock, and a save first re-reads the file and journal if another
+    process wrote to them, so no process overwrites the others' changes.
+    """
+
+    name = "json"
+
+    def __init__(self, json_file, metrics=None):
+        self.json_file = self.path = Path(json_file)
+        self.metrics = metrics  # Times the first parse as "load_json"
+        # Append-only change log, folded into the JSON file by save()
+        self.journal_file = self.json_file.with_name(self.json_file.name + ".journal")
+        self.lock_file = self.json_file.with_name(self.json_file.name + ".lock")
+        self.journal_entries = 0
+        # (file stat, journal size) as this process last left them
+        self.disk_state = None
+        self._lock = threading.RLock()
+        self._data = None
+        self._index = {}
+
+    @property
+    def data(self):
+        if self._data is None:
+            # Parsed on first use, so commands that only append never read it
+            span = self.metrics.span("load_json") if self.metrics else nullcontext({})
+            with span as record:
+                self.data = self.load()
+                record["bytes"] = self.json_file.stat().st_size
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        # Any reload invalidates the link index; it is rebuilt on next lookup
+        self._data = value
+        self._index = {}
+
+    def _link_index(self, media_type):
+        """Get the {canonical key: list position} index for a media type"""
+        index = self._index.get(media_type)
+        if index is None:
+            index = {}
+            for i, item in enumerate(self.links(media_type)):
+                if "link" in item:
+                    # First occurrence wins, like the old linear scan
+                    index.setdefault(link_key(item["link"]), i)
+            self._index[media_type] = index
+        return index
+
+    def load(self):
+        """Load the downloads JSON file or create new one
+
+        Changes journaled since the last save are replayed on top, so
+        nothing recorded before a crash is lost.
+        """
+        with self._lock, file_lock(self.lock_file):
+            return self._load()
+
+    def _disk_state(self):
+        try:
+            stat = self.json_file.stat()
+            file_state = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            file_state = None
+        try:
+            journal_size = self.journal_file.stat().st_size
+        except OSError:
+            journal_size = 0
+        return file_state, journal_size
+
+    def _load(self):
         if not self.json_file.exists():
             default_data = {
                 "audio": {"links": []},
@@ -31,29 +1929,908 @@ class YTDawn:
             }
             with open(self.json_file, "w", encoding="utf-8") as f:
                 json.dump(default_data, f, indent=2)
-            return default_data
+            data = default_data
+        else:
+            with open(self.json_file, "r", encoding="utf-8") as f:
+                data = json.load(f, object_hook=LinkRecord.json_hook)
+
+        self.journal_entries = self.replay_journal(data)
+        self.disk_state = self._disk_state()
+        return data
+
+    def _convert(self, data):
+        """Turn the links lists of parsed downloads.json data into records"""
+        for media_type in ("audio", "video"):
+            section = data.get(media_type)
+            if isinstance(section, dict) and "links" in section:
+                section["links"] = LinkRecord.convert(section["links"])
+
+    def reload(self):
+        """Re-read the file to pick up links added by hand or other processes"""
+        self.data = self.load()
+
+    def signature(self):
+        """(mtime, size) of downloads.json and its journal, to notice edits
+
+        The journal counts too because `-aa` only appends to it.
+        """
+        signature = []
+        for path in (self.json_file, self.journal_file):
+            try:
+                stat = path.stat()
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def cursor(self, media_type):
+        """Mark how far the catalogue has been seen, for added_since()"""
+        links = self.links(media_type)
+        return len(links), link_key(links[-1].get("link", "")) if links else None
+
+    def added_since(self, media_type, cursor):
+        """Pending records added after cursor, plus the new cursor
+
+        Hand edits append to the list, so only the tail past the cursor is
+        looked at. If the list was reordered or trimmed instead, every
+        pending record is returned.
+        """
+        links = self.links(media_type)
+        seen, last_key = cursor
+        if seen and (
+            seen > len(links) or link_key(links[seen - 1].get("link", "")) != last_key
+        ):
+            added = self.pending(media_type)
+        else:
+            added = [
+                item
+                for item in links[seen:]
+                if "link" in item
+                and not item.get("is_downloaded", False)
+                and not item.get("failed")
+            ]
+        return added, self.cursor(media_type)
+
+    def save(self, replace=False):
+        """Save data back to JSON file
+
+        Writes to a temp file and renames it over the original, so a crash
+        mid-write never leaves a truncated downloads.json. The journal is
+        emptied afterwards since everything in it is now in the file. If
+        another process changed either file meanwhile, they are re-read
+        first (all of our changes are in the journal too), unless replace
+        is set to overwrite them with this process's data.
+        """
+        with self._lock, file_lock(self.lock_file):
+            if not replace and self._disk_state() != self.disk_state:
+                self.data = self._load()
+            tmp_file = self.json_file.with_name(self.json_file.name + ".tmp")
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, indent=2, ensure_ascii=False, default=dict)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.json_file)
+
+            if self.journal_entries or replace:
+                self.journal_file.unlink(missing_ok=True)
+                self.journal_entries = 0
+            self.disk_state = self._disk_state()
+
+    def replay_journal(self, data):
+        """Apply journaled changes to freshly loaded data, return entry count"""
+        if not self.journal_file.exists():
+            return 0
+
+        indexes = {}
+
+        def find(media_type, key):
+            if media_type not in indexes:
+                links = data.setdefault(media_type, {}).setdefault("links", [])
+                indexes[media_type] = {
+                    link_key(item["link"]): item for item in links if "link" in item
+                }
+            return indexes[media_type].get(key)
+
+        count = 0
+        good_bytes = 0
+        with open(self.journal_file, "rb") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # Torn last line from a crash mid-append
+                good_bytes += len(line)
+                count += 1
+
+                op = entry.get("op")
+                if op == "meta":
+                    data.setdefault("meta", {}).update(entry["fields"])
+                elif op == "add":
+                    media_type = entry["type"]
+                    key = link_key(entry["entry"]["link"])
+                    if find(media_type, key) is None:
+                        record = LinkRecord(entry["entry"])
+                        data[media_type]["links"].append(record)
+                        indexes[media_type][key] = record
+                elif op == "set":
+                    item = find(entry["type"], entry["key"])
+                    if item is not None:
+                        item.update(entry["fields"])
+
+        # Cut off a torn tail so the next append starts on a clean line
+        if good_bytes < self.journal_file.stat().st_size:
+            os.truncate(self.journal_file, good_bytes)
+
+        return count
+
+    def journal(self, *entries):
+        """Append changes to the journal, compacting when it grows large"""
+        lines = "".join(
+            json.dumps(e, ensure_ascii=False, default=dict) + "\n" for e in entries
+        )
+        data = lines.encode("utf-8")
+        with self._lock, file_lock(self.lock_file):
+            with open(self.journal_file, "ab") as f:
+                f.write(data)
+            if self.disk_state:
+                file_state, journal_size = self.disk_state
+                self.disk_state = file_state, journal_size + len(data)
+            self.journal_entries += len(entries)
+            compact = self.journal_entries >= JOURNAL_COMPACT_EVERY
+
+        if compact:
+            self.save()
+
+    def links(self, media_type):
+        """All records of a media type, in catalogue order"""
+        return self.data.get(media_type, {}).get("links", [])
+
+    def pending(self, media_type):
+        """Records that are not downloaded yet (and not given up on)"""
+        return [
+            item
+            for item in self.links(media_type)
+            if "link" in item
+            and not item.get("is_downloaded", False)
+            and not item.get("failed")
+        ]
+
+    def count(self, media_type, pending=False):
+        """Number of records, or of pending records"""
+        if pending:
+            return len(self.pending(media_type))
+        return len(self.links(media_type))
+
+    def find(self, link, media_type):
+        """Find a link by video ID, returning (position, record)
+
+        Lookups go through an index keyed by video ID, so different URL
+        forms of the same video (youtu.be, watch?v=...&t=, shorts) match.
+        """
+        links = self.links(media_type)
+        key = link_key(link)
+        i = self._link_index(media_type).get(key)
+
+        # Rebuild if the list was changed behind the index's back
+        if i is not None and (
+            i >= len(links) or link_key(links[i].get("link", "")) != key
+        ):
+            self._index.pop(media_type, None)
+            i = self._link_index(media_type).get(key)
+
+        if i is None:
+            return None, None
+        return i, links[i]
+
+    def add(self, entry, media_type):
+        """Append a new record and journal it"""
+        links = self.data.setdefault(media_type, {}).setdefault("links", [])
+        record = LinkRecord(entry)
+        links.append(record)
+        self._link_index(media_type)[link_key(entry["link"])] = len(links) - 1
+        self.journal({"op": "add", "type": media_type, "entry": entry})
+        return record
+
+    def add_many(self, entries, media_type):
+        """Append records whose video ID is new, return how many were added
+
+        Records are indexed as they are consumed (so duplicates within
+        entries are dropped too) and journaled in one write at the end. If
+        the catalogue hasn't been read yet, the records are only journaled
+        and duplicates are dropped when the journal is replayed.
+        """
+        if self._data is None:
+            added = [{"op": "add", "type": media_type, "entry": e} for e in entries]
+            if added:
+                self.journal(*added)
+            return len(added)
+
+        links = self.data.setdefault(media_type, {}).setdefault("links", [])
+        index = self._link_index(media_type)
+        added = []
+        for entry in entries:
+            key = link_key(entry["link"])
+            if key in index:
+                continue
+            links.append(LinkRecord(entry))
+            index[key] = len(links) - 1
+            added.append({"op": "add", "type": media_type, "entry": entry})
+
+        if added:
+            self.journal(*added)
+        return len(added)
+
+    def update(self, link, media_type, fields):
+        """Set fields on a stored record and journal the change"""
+        _, item = self.find(link, media_type)
+        if item is None:
+            return None
+
+        item.update(fields)
+        self.journal(
+            {"op": "set", "type": media_type, "key": link_key(link), "fields": fields}
+        )
+        return item
+
+    def normalize(self, media_type):
+        """Normalize manually added links - ensure all fields exist
+
+        The filled-in fields are journaled like any other change, so a save
+        that has to merge another process's writes keeps them.
+        """
+        defaults = {
+            "is_downloaded": False,
+            "format": "opus" if media_type == "audio" else "",
+            "path": "",
+            "title": "",
+            "filesize": 0,
+        }
+        changes = []
+
+        for item in self.links(media_type):
+            # Ensure required fields exist
+            if "link" not in item:
+                continue  # Skip invalid entries
+
+            missing = {k: v for k, v in defaults.items() if k not in item}
+            if missing:
+                item.update(missing)
+                key = link_key(item["link"])
+                changes.append(
+                    {"op": "set", "type": media_type, "key": key, "fields": missing}
+                )
+
+        if changes:
+            self.journal(*changes)
+            self.save()
+
+        return bool(changes)
+
+    def meta(self):
+        """The meta section (default-path and tuning options)"""
+        return self.data.get("meta", {})
+
+    def set_meta(self, **fields):
+        """Update meta values and journal the change"""
+        self.data.setdefault("meta", {}).update(fields)
+        self.journal({"op": "meta", "fields": fields})
+
+    def export_data(self):
+        """The whole catalogue in the downloads.json schema"""
+        return self.data
+
+    def import_data(self, data):
+        """Replace the whole catalogue with data in the downloads.json schema"""
+        self._convert(data)
+        self.data = data
+        self.save(replace=True)
+
+
+class SqliteStore:
+    """Link catalogue kept in an SQLite database (downloads.db)
+
+    Media type, download state and video ID are indexed, so pending
+    queries, counts and single-link updates are one indexed statement each
+    instead of a pass over the whole catalogue. Fields without a column of
+    their own are kept as JSON in `extra`, so nothing is lost on export.
+    """
+
+    name = "sqlite"
+    columns = ("link", "title", "is_downloaded", "format", "path", "filesize")
+    # Links given up on after repeated failures keep "failed" in extra
+    pending_sql = (
+        "is_downloaded = 0 AND COALESCE(json_extract(extra, '$.failed'), 0) = 0"
+    )
+    schema = """
+        CREATE TABLE IF NOT EXISTS links (
+            id INTEGER PRIMARY KEY,
+            media_type TEXT NOT NULL,
+            video_id TEXT NOT NULL,
+            link TEXT NOT NULL,
+            title TEXT NOT NULL DEFAULT '',
+            is_downloaded INTEGER NOT NULL DEFAULT 0,
+            format TEXT NOT NULL DEFAULT '',
+            path TEXT NOT NULL DEFAULT '',
+            filesize INTEGER NOT NULL DEFAULT 0,
+            extra TEXT NOT NULL DEFAULT '{}'
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS links_video ON links (media_type, video_id);
+        CREATE INDEX IF NOT EXISTS links_state ON links (media_type, is_downloaded);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+    """
+
+    def __init__(self, db_file):
+        import sqlite3
+
+        self.db_file = self.path = Path(db_file)
+        new = not self.db_file.exists()
+        # Autocommit: every statement is its own transaction unless BEGIN'd
+        self.db = sqlite3.connect(
+            self.db_file, check_same_thread=False, isolation_level=None
+        )
+        self.db.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(self.schema)
+        if new:
+            self.set_meta(**{"default-path": "downloads"})
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self.db.execute(sql, params).fetchall()
+
+    def _record(self, row):
+        """Turn a links row back into a downloads.json style record"""
+        item = LinkRecord()
+        item.link = row["link"]
+        item.title = row["title"]
+        item.is_downloaded = bool(row["is_downloaded"])
+        item["format"] = row["format"]
+        item["path"] = row["path"]
+        item.filesize = row["filesize"]
+        extra = row["extra"]
+        if extra != "{}":
+            item.extra = json.loads(extra)
+        return item
+
+    def _row(self, item, media_type):
+        """Split a record into column values plus the JSON extra blob"""
+        extra = {k: v for k, v in item.items() if k not in self.columns}
+        return (
+            media_type,
+            link_key(item["link"]),
+            item["link"],
+            item.get("title", ""),
+            int(bool(item.get("is_downloaded", False))),
+            item.get("format") or ("opus" if media_type == "audio" else ""),
+            item.get("path", ""),
+            item.get("filesize") or 0,
+            json.dumps(extra, ensure_ascii=False),
+        )
+
+    def reload(self):
+        """Nothing to do - every query reads the live database"""
+
+    def signature(self):
+        """SQLite's data_version, which changes when another process commits"""
+        return self._execute("PRAGMA data_version")[0][0]
+
+    def cursor(self, media_type):
+        """Mark how far the catalogue has been seen, for added_since()"""
+        rows = self._execute(
+            "SELECT MAX(id) FROM links WHERE media_type = ?", (media_type,)
+        )
+        return rows[0][0] or 0
+
+    def added_since(self, media_type, cursor):
+        """Pending records added after cursor, plus the new cursor"""
+        rows = self._execute(
+            f"SELECT * FROM links WHERE media_type = ? AND id > ? "
+            f"AND {self.pending_sql} ORDER BY id",
+            (media_type, cursor),
+        )
+        return [self._record(row) for row in rows], self.cursor(media_type)
+
+    def save(self):
+        """Nothing to do - every change is committed as it happens"""
+
+    def links(self, media_type):
+        """All records of a media type, in insertion order"""
+        rows = self._execute(
+            "SELECT * FROM links WHERE media_type = ? ORDER BY id", (media_type,)
+        )
+        return [self._record(row) for row in rows]
+
+    def pending(self, media_type):
+        """Records that are not downloaded yet (and not given up on)"""
+        rows = self._execute(
+            f"SELECT * FROM links WHERE media_type = ? AND {self.pending_sql} "
+            "ORDER BY id",
+            (media_type,),
+        )
+        return [self._record(row) for row in rows]
+
+    def count(self, media_type, pending=False):
+        """Number of records, or of pending records"""
+        sql = "SELECT COUNT(*) FROM links WHERE media_type = ?"
+        if pending:
+            sql += f" AND {self.pending_sql}"
+        return self._execute(sql, (media_type,))[0][0]
+
+    def find(self, link, media_type):
+        """Find a link by video ID, returning (row id, record)"""
+        rows = self._execute(
+            "SELECT * FROM links WHERE media_type = ? AND video_id = ?",
+            (media_type, link_key(link)),
+        )
+        if not rows:
+            return None, None
+        return rows[0]["id"], self._record(rows[0])
+
+    def add_many(self, entries, media_type):
+        """Insert records in one transaction, return how many were new"""
+        with self._lock:
+            before = self.db.total_changes
+            self.db.execute("BEGIN")
+            try:
+                self.db.executemany(
+                    "INSERT OR IGNORE INTO links (media_type, video_id, link, title, "
+                    "is_downloaded, format, path, filesize, extra) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (self._row(entry, media_type) for entry in entries),
+                )
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            return self.db.total_changes - before
+
+    def add(self, entry, media_type):
+        """Insert a new record (duplicate video IDs are ignored)"""
+        self._execute(
+            "INSERT OR IGNORE INTO links (media_type, video_id, link, title, "
+            "is_downloaded, format, path, filesize, extra) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            self._row(entry, media_type),
+        )
+        return entry
+
+    def update(self, link, media_type, fields):
+        """Set fields on a stored record"""
+        with self._lock:
+            row_id, item = self.find(link, media_type)
+            if item is None:
+                return None
+            item.update(fields)
+
+            columns = [k for k in fields if k in self.columns and k != "link"]
+            values = [
+                int(bool(fields[k])) if k == "is_downloaded" else fields[k]
+                for k in columns
+            ]
+            assignments = [f"{k} = ?" for k in columns]
+            if any(k not in self.columns for k in fields):
+                extra = {k: v for k, v in item.items() if k not in self.columns}
+                assignments.append("extra = ?")
+                values.append(json.dumps(extra, ensure_ascii=False))
+
+            if assignments:
+                self.db.execute(
+                    f"UPDATE links SET {', '.join(assignments)} WHERE id = ?",
+                    (*values, row_id),
+                )
+            return item
+
+    def normalize(self, media_type):
+        """Nothing to do - the schema fills in every field"""
+        return False
+
+    def meta(self):
+        """The meta section (default-path and tuning options)"""
+        rows = self._execute("SELECT key, value FROM meta")
+        return {row["key"]: json.loads(row["value"]) for row in rows}
 
-        with open(self.json_file, "r", encoding="utf-8") as f:
-            return json.load(f)
+    def set_meta(self, **fields):
+        """Update meta values"""
+        with self._lock:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [(k, json.dumps(v, ensure_ascii=False)) for k, v in fields.items()],
+            )
+
+    def export_data(self):
+        """The whole catalogue in the downloads.json schema"""
+        return {
+            "audio": {"links": self.links("audio")},
+            "video": {"links": self.links("video")},
+            "meta": self.meta(),
+        }
+
+    def import_data(self, data):
+        """Replace the whole catalogue with data in the downloads.json schema
+
+        Later duplicates of the same video are dropped.
+        """
+        with self._lock:
+            self.db.execute("BEGIN")
+            try:
+                self.db.execute("DELETE FROM links")
+                self.db.execute("DELETE FROM meta")
+                for media_type in ("audio", "video"):
+                    self.db.executemany(
+                        "INSERT OR IGNORE INTO links (media_type, video_id, link, "
+                        "title, is_downloaded, format, path, filesize, extra) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        [
+                            self._row(item, media_type)
+                            for item in data.get(media_type, {}).get("links", [])
+                            if "link" in item
+                        ],
+                    )
+                self.set_meta(**data.get("meta", {}))
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+
+
+class WorkLeases:
+    """Per-link claims that let several worker processes share one queue
+
+    A lease is a small JSON file in lease_dir (next to the catalogue, so
+    workers on other machines sharing the folder see it too) holding its
+    owner and expiry time. claim() takes a link unless another worker holds
+    an unexpired lease on it; a background thread renews the held leases
+    every ttl/3 seconds, so the lease of a worker that died runs out after
+    at most ttl seconds and the link is picked up by someone else. Claims
+    and takeovers are decided under a file lock in lease_dir.
+    """
+
+    def __init__(self, lease_dir, ttl=DEFAULT_LEASE_TTL):
+        self.lease_dir = Path(lease_dir)
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{os.urandom(4).hex()}"
+        self.held = set()  # Links whose lease is renewed
+        self.lock = threading.Lock()
+        self.renewer = None
+
+    def _path(self, link):
+        return self.lease_dir / f"{link_hash(link)}.lease"
+
+    def _read(self, path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, link, expires):
+        path = self._path(link)
+        tmp_file = path.with_name(f"{path.name}.{self.owner.split(':')[-1]}.tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump({"owner": self.owner, "link": link, "expires": expires}, f)
+        os.replace(tmp_file, path)
+
+    @contextmanager
+    def _locked(self):
+        self.lease_dir.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.lease_dir / ".lock"):
+            yield
+
+    def claim(self, link):
+        """Take the lease on link, False if another worker holds it"""
+        with self._locked():
+            lease = self._read(self._path(link))
+            if (
+                lease
+                and lease.get("owner") != self.owner
+                and lease.get("expires", 0) > time.time()
+            ):
+                return False
+            self._write(link, time.time() + self.ttl)
+            with self.lock:
+                self.held.add(link)
+
+        with self.lock:
+            if self.renewer is None:
+                self.renewer = threading.Thread(target=self._renew, daemon=True)
+                self.renewer.start()
+        return True
+
+    def _renew(self):
+        while True:
+            time.sleep(self.ttl / 3)
+            with self.lock:
+                links = list(self.held)
+            for link in links:
+                with self._locked():
+                    if link in self.held:
+                        self._write(link, time.time() + self.ttl)
+
+    def taken(self):
+        """Links other workers hold unexpired leases on"""
+        now = time.time()
+        links = set()
+        try:
+            entries = list(os.scandir(self.lease_dir))
+        except OSError:
+            return links
+        for entry in entries:
+            if not entry.name.endswith(".lease"):
+                continue
+            lease = self._read(entry.path)
+            if (
+                lease
+                and lease.get("owner") != self.owner
+                and lease.get("expires", 0) > now
+            ):
+                links.add(lease.get("link"))
+        return links
+
+    def hold(self, link, until):
+        """Keep other workers off link until `until` (e.g. its retry time)"""
+        with self._locked():
+            with self.lock:
+                self.held.discard(link)
+            self._write(link, until)
+
+    def release(self, link):
+        """Give up the lease on link so any worker may take it"""
+        with self._locked():
+            with self.lock:
+                self.held.discard(link)
+            lease = self._read(self._path(link))
+            if lease and lease.get("owner") == self.owner:
+                self._path(link).unlink(missing_ok=True)
+
+    def release_all(self):
+        """Release every lease still being renewed (on exit or Ctrl+C)"""
+        with self.lock:
+            links = list(self.held)
+        for link in links:
+            self.release(link)
+
+    def clear(self, link):
+        """Remove any lease on link, whoever holds it"""
+        with self._locked():
+            self._path(link).unlink(missing_ok=True)
+
+
+class YTDawn:
+    def __init__(
+        self,
+        json_file="downloads.json",
+        workers=None,
+        engine=None,
+        jobs=None,
+        order=None,
+        storage=None,
+        batch_size=None,
+        metrics_file=None,
+        events=None,
+        max_height=None,
+        fragments=None,
+        rate_limit=None,
+    ):
+        # Timing spans per phase, written out by export_metrics()
+        self.metrics = Metrics()
+        self.metrics_file = metrics_file
+        # Called with (link, ProgressEvent) for every download progress sample
+        self.progress_listeners = [self.metrics.on_progress]
+        # EventStream for --events ndjson (None = console output only)
+        self.events = events
+        if events:
+            self.progress_listeners.append(events.progress)
+        # Get the directory where the script is located
+        self.script_dir = Path(__file__).parent.resolve()
+        # Always use the script's directory for the JSON file
+        self.json_file = self.script_dir / json_file
+        # SQLite catalogue lives next to it (downloads.json -> downloads.db)
+        self.db_file = self.json_file.with_suffix(".db")
+        self.store = self.open_store(storage)
+        # What is already on disk, by video ID (loaded on first scan)
+        self.file_index = None
+        # Resolved metadata shared by every lookup (loaded on first use)
+        self._metadata_cache = None
+        # Metadata pool width and URLs per call (None = read from meta)
+        self.workers = workers
+        self.batch_size = batch_size
+        # Parallel downloads and their ordering (None = read from meta)
+        self.jobs = jobs
+        self.order = order
+        # Video height cap and fragments per download (None = read from meta)
+        self.max_height = max_height
+        self.fragments = fragments
+        # Total download rate in bytes/s (None = read from meta)
+        self.rate_limit = rate_limit
+        # yt-dlp backend (None = read from meta or use auto), created on use
+        self.engine_name = engine
+        self._engine = None
+        # ffmpeg conversion stage for audio (created on first use)
+        self._transcoder = None
+        # Claims on links shared with other worker processes (on first use)
+        self._leases = None
+        # Set on Ctrl+C, so jobs that end meanwhile aren't counted as failures
+        self.stopping = threading.Event()
+
+    @property
+    def engine(self):
+        # Created on first use: importing yt_dlp alone takes a few hundred ms
+        if self._engine is None:
+            name = self.engine_name or self.meta.get("engine", "auto")
+            self._engine = create_engine(name)
+            self._engine.metrics = self.metrics
+            self._engine.stopping = self.stopping
+        return self._engine
+
+    @property
+    def leases(self):
+        if self._leases is None:
+            ttl = self.meta.get("lease-ttl", DEFAULT_LEASE_TTL)
+            self._leases = WorkLeases(self.json_file.with_suffix(".leases"), ttl)
+        return self._leases
+
+    @property
+    def transcoder(self):
+        if self._transcoder is None:
+            workers = self.meta.get("transcode-workers")
+            self._transcoder = Transcoder(workers and int(workers), self.metrics)
+        return self._transcoder
+
+    def open_store(self, storage=None):
+        """Open the catalogue backend (default: SQLite if downloads.db has links)
+
+        An empty downloads.db, e.g. left by a --storage sqlite run without
+        --import-json, doesn't take over from downloads.json.
+        """
+        if storage is None and self.db_file.exists():
+            store = SqliteStore(self.db_file)
+            if store.count("audio") or store.count("video"):
+                return store
+            store.db.close()
+        if storage == "sqlite":
+            return SqliteStore(self.db_file)
+        return JsonStore(self.json_file, self.metrics)
+
+    @property
+    def meta(self):
+        return self.store.meta()
+
+    def load_json(self):
+        """Reload the link catalogue from storage"""
+        with self.metrics.span("load_json") as span:
+            self.store.reload()
+            span["bytes"] = self._catalogue_bytes()
 
     def save_json(self):
-        """Save data back to JSON file"""
-        with open(self.json_file, "w", encoding="utf-8") as f:
-            json.dump(self.data, f, indent=2, ensure_ascii=False)
+        """Write all pending catalogue changes to storage"""
+        with self.metrics.span("save_json") as span:
+            self.store.save()
+            span["bytes"] = self._catalogue_bytes()
+
+    def _catalogue_bytes(self):
+        """Size of downloads.json, reported by the load and save spans"""
+        if self.store.name != "json":
+            return 0
+        try:
+            return self.store.path.stat().st_size
+        except OSError:
+            return 0
+
+    def emit(self, event, **fields):
+        """Send a lifecycle event to the --events stream, if there is one"""
+        if self.events:
+            self.events.emit(event, **fields)
+
+    def progress_callback(self, link, *consumers):
+        """on_progress for one download: feed consumers and every listener"""
+        listeners = list(consumers) + self.progress_listeners
+
+        def on_progress(event):
+            for listener in listeners:
+                listener(link, event)
+
+        return on_progress
+
+    def export_metrics(self):
+        """Write the metrics summary if --metrics or meta.metrics-file is set"""
+        metrics_file = self.metrics_file or self.meta.get("metrics-file")
+        if metrics_file:
+            self.metrics.write(metrics_file)
+
+    def import_json(self, json_path):
+        """Replace the catalogue with the contents of a downloads.json file"""
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.store.import_data(data)
+        print(
+            f"✅ Imported {self.store.count('audio')} audio and "
+            f"{self.store.count('video')} video link(s) into {self.store.name} storage"
+        )
+
+    def import_links(self, source, media_type="audio", priority=None):
+        """Add every link of a URL list, CSV or JSON file ("-" for stdin)
+
+        Entries are canonicalized and deduplicated by video ID against the
+        catalogue and each other in one pass through the store's index, and
+        everything new is committed in a single write. Nothing is looked up:
+        titles and sizes are fetched on the next download run. priority
+        applies to entries without their own.
+        """
+        if source == "-":
+            text = sys.stdin.read()
+        else:
+            with open(source, "r", encoding="utf-8-sig") as f:
+                text = f.read()
+
+        records = {"audio": [], "video": []}
+        invalid = []
+        for kind, entry in read_import(text, media_type):
+            record = import_record(entry, kind)
+            if record is None:
+                invalid.append(entry)
+                continue
+            if priority is not None:
+                record.setdefault("priority", priority)
+            records[kind].append(record)
+
+        added = duplicates = 0
+        for kind, entries in records.items():
+            if not entries:
+                continue
+            # Counted on both sides so journal-only appends are exact too
+            before = self.store.count(kind)
+            self.store.add_many(entries, kind)
+            new = self.store.count(kind) - before
+            added += new
+            duplicates += len(entries) - new
+
+        name = "stdin" if source == "-" else source
+        print(
+            f"✅ Imported {name}: {added} added, {duplicates} duplicate, "
+            f"{len(invalid)} invalid"
+        )
+        for entry in invalid[:5]:
+            print(f"   ❌ Not a video link: {str(entry)[:70]}")
+        if len(invalid) > 5:
+            print(f"   ... and {len(invalid) - 5} more")
+        return added
+
+    def export_json(self, json_path):
+        """Write the catalogue to a file in the downloads.json schema"""
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(
+                self.store.export_data(), f, indent=2, ensure_ascii=False, default=dict
+            )
+        print(f"✅ Exported catalogue to {json_path}")
+
+    def update_link(self, link, media_type, **fields):
+        """Set fields on a stored link"""
+        return self.store.update(link, media_type, fields)
 
     def get_download_path(self):
         """Get the download path from meta or use default"""
-        default_path = self.data.get("meta", {}).get("default-path", "downloads")
+        default_path = self.meta.get("default-path", "downloads")
         Path(default_path).mkdir(parents=True, exist_ok=True)
         return default_path
 
+    def get_metadata_workers(self):
+        """Get the metadata prefetch pool width from CLI, meta or default"""
+        workers = self.workers or self.meta.get(
+            "metadata-workers", DEFAULT_METADATA_WORKERS
+        )
+        return max(1, int(workers))
+
+    def get_metadata_batch_size(self):
+        """Get the number of URLs per metadata call from CLI, meta or default"""
+        size = self.batch_size or self.meta.get(
+            "metadata-batch-size", DEFAULT_METADATA_BATCH_SIZE
+        )
+        return max(1, int(size))
+
     def find_link(self, link, media_type):
         """Find a link in the specified media type list"""
-        links = self.data.get(media_type, {}).get("links", [])
-        for i, item in enumerate(links):
-            if item.get("link") == link:
-                return i, item
-        return None, None
+        return self.store.find(link, media_type)
 
     def add_or_update_link(self, link, media_type):
         """Add new link or update existing one"""
@@ -61,138 +2838,317 @@ class YTDawn:
 
         if existing is None:
             # Add new link
-            new_entry = {
-                "link": link,
-                "title": "",
-                "is_downloaded": False,
-                "format": "opus" if media_type == "audio" else "",
-                "path": "",
-            }
-            self.data[media_type]["links"].append(new_entry)
-            self.save_json()
-            return new_entry
+            return self.store.add(new_link_record(link, media_type), media_type)
         else:
             return existing
 
+    def expand_collection(self, url, media_type):
+        """Add every video of a playlist or channel, return how many were new
+
+        Entries come from a streaming flat extraction and are deduplicated
+        against the catalogue by video ID as they arrive, then persisted in
+        one write. The sync position is kept in meta.playlists: re-expanding
+        a playlist only lists entries past the last known count, and a
+        channel (newest first) stops at the newest video seen last time.
+        """
+        kind = collection_kind(url)
+        url = url.strip()
+        if kind == "channel" and CHANNEL_PATTERN.search(url):
+            url = url.rstrip("/") + "/videos"  # The uploads tab, not the home page
+
+        playlists = self.meta.get("playlists", {})
+        sync = playlists.get(url, {})
+        start = sync.get("count", 0) + 1 if kind == "playlist" else 1
+        listed = 0
+        newest = None
+
+        def records():
+            nonlocal listed, newest
+            entries = self.engine.expand_playlist(url, start=start)
+            try:
+                for entry in entries:
+                    video_id = entry.get("id")
+                    if kind == "channel" and video_id == sync.get("latest"):
+                        break  # Everything from here on was listed before
+                    listed += 1  # Counts every position, for the next start
+                    if not video_id:
+                        continue
+                    newest = newest or video_id
+                    print(f"\r  [{listed}] Listing...", end="", flush=True)
+
+                    link = entry.get("url") or ""
+                    if not link.startswith("http"):
+                        link = f"https://www.youtube.com/watch?v={video_id}"
+                    record = new_link_record(link, media_type)
+                    if entry.get("title"):
+                        record["title"] = entry["title"]
+                    yield record
+            finally:
+                entries.close()
+
+        print(f"\n⏳ Listing {kind} {url}...")
+        added = self.store.add_many(records(), media_type)
+        if listed:
+            print("\r" + " " * 50 + "\r", end="", flush=True)
+
+        playlists = dict(playlists)
+        playlists[url] = {
+            "count": sync.get("count", 0) + listed,
+            "latest": newest or sync.get("latest"),
+            "synced": int(time.time()),
+        }
+        self.store.set_meta(playlists=playlists)
+        print(
+            f"✅ Added {added} new {media_type} link(s) from {kind} "
+            f"({listed} listed, {listed - added} already known)"
+        )
+        return added
+
     def normalize_links(self, media_type):
         """Normalize manually added links - ensure all fields exist"""
-        links = self.data.get(media_type, {}).get("links", [])
-        modified = False
+        return self.store.normalize(media_type)
 
-        for item in links:
-            # Ensure required fields exist
-            if "link" not in item:
-                continue  # Skip invalid entries
+    @property
+    def metadata_cache(self):
+        if self._metadata_cache is None:
+            self._metadata_cache = MetadataCache(
+                self.json_file.with_suffix(".cache.json"),
+                ttl=self.meta.get("metadata-ttl", DEFAULT_METADATA_TTL),
+                max_entries=self.meta.get("metadata-cache-size"),
+            )
+        return self._metadata_cache
 
-            if "is_downloaded" not in item:
-                item["is_downloaded"] = False
-                modified = True
+    def _metadata_result(self, entry):
+        """(title, filesize) for a cache entry, with "[Timeout]" on timeouts"""
+        if entry.get("error") == "timeout":
+            return "[Timeout]", 0
+        if "error" in entry:
+            return "", 0
+        return entry["title"], entry["filesize"]
 
-            if "format" not in item:
-                item["format"] = "opus" if media_type == "audio" else ""
-                modified = True
+    def _batch_timeout(self, links):
+        return METADATA_TIMEOUT + METADATA_TIMEOUT_PER_LINK * (len(links) - 1)
 
-            if "path" not in item:
-                item["path"] = ""
-                modified = True
+    def metadata_format(self, media_type, fmt=""):
+        """Format selector a link is resolved with: the one it downloads with"""
+        if media_type == "video":
+            return self.video_options(fmt)["selector"]
+        return "bestaudio"
 
-            if "title" not in item:
-                item["title"] = ""
-                modified = True
+    def _resolve_batch(self, links, fmt="bestaudio"):
+        """Resolve a batch of links in one engine call and cache every result"""
+        with self.metrics.span("metadata") as span:
+            try:
+                results = self.engine.get_metadata_batch(
+                    links, timeout=self._batch_timeout(links), fmt=fmt
+                )
+            except Exception as e:
+                results = {link: e for link in links}
+            span["result"] = self._batch_result(results)
+        return self._cache_results(links, results, fmt)
 
-            if "filesize" not in item:
-                item["filesize"] = 0
-                modified = True
+    def _batch_result(self, results):
+        """ "ok", "partial" or "failed" for a batch of engine results"""
+        resolved = sum(isinstance(r, dict) for r in results.values())
+        if resolved == len(results):
+            return "ok"
+        return "partial" if resolved else "failed"
 
-        if modified:
-            self.save_json()
+    def _cache_results(self, links, results, fmt="bestaudio"):
+        """Store engine results in the metadata cache, return (link, entry)s"""
+        entries = []
+        for link in links:
+            result = results.get(link)
+            key = metadata_key(link, fmt)
+            if isinstance(result, TimeoutError):
+                entry = self.metadata_cache.put_failure(key, "timeout")
+            elif isinstance(result, dict):
+                entry = self.metadata_cache.put(key, result)
+            else:
+                entry = self.metadata_cache.put_failure(key, "error")
+            entries.append((link, entry))
 
-        return modified
+            if self.events:
+                title, filesize = self._metadata_result(entry)
+                fields = {"error": entry["error"]} if "error" in entry else {}
+                self.emit(
+                    "metadata-resolved",
+                    link=link,
+                    title=title,
+                    filesize=filesize,
+                    **fields,
+                )
+        return entries
 
-    def get_video_title(self, link):
-        """Fetch video title from YouTube using yt-dlp (silent, fast)"""
-        try:
-            cmd = [
-                "yt-dlp",
-                "--get-title",
-                "--no-warnings",
-                "--no-playlist",
-                "--skip-download",
-                link,
-            ]
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=10,  # 10 second timeout
-                creationflags=subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0,
+    def resolve_metadata(self, links, fmt="bestaudio"):
+        """Resolve many links, yielding (link, title, filesize) as they finish
+
+        Sizes are those of the fmt selector. Cached results come first. The
+        remaining links are split into batches of metadata-batch-size URLs,
+        each resolved by one yt-dlp call, with up to metadata-workers
+        batches in flight.
+        """
+        misses = {}  # video key -> links sharing it
+        for link in links:
+            key = link_key(link)
+            entry = (
+                None
+                if key in misses
+                else self.metadata_cache.get(metadata_key(link, fmt))
             )
-            title = result.stdout.strip()
-            return title if title else ""
-        except subprocess.TimeoutExpired:
-            return "[Timeout]"
-        except:
-            return ""
-
-    def get_video_metadata(self, link):
-        """Fetch title and filesize from YouTube (silent)"""
-        try:
-            cmd = [
-                "yt-dlp",
-                "--no-warnings",
-                "--no-playlist",
-                "--dump-json",
-                "-f",
-                "bestaudio",
-                link,
+            if entry is None:
+                misses.setdefault(key, []).append(link)
+            else:
+                yield (link, *self._metadata_result(entry))
+
+        unique = [same[0] for same in misses.values()]
+        size = self.get_metadata_batch_size()
+        batches = [unique[i : i + size] for i in range(0, len(unique), size)]
+        if not batches:
+            return
+
+        # Imported here: concurrent.futures adds noticeably to CLI startup
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        with ThreadPoolExecutor(max_workers=self.get_metadata_workers()) as pool:
+            futures = [
+                pool.submit(self._resolve_batch, batch, fmt) for batch in batches
             ]
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=15,  # 15 second timeout
-                creationflags=subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0,
-            )
-            data = json.loads(result.stdout.strip())
-            title = data.get("title", "")
-            filesize = data.get("filesize") or data.get("filesize_approx", 0)
-            return title, filesize
-        except subprocess.TimeoutExpired:
-            return "[Timeout]", 0
-        except:
-            return "", 0
+            try:
+                for future in as_completed(futures):
+                    for link, entry in future.result():
+                        for same in misses[link_key(link)]:
+                            yield (same, *self._metadata_result(entry))
+            finally:
+                # Don't wait for queued batches on Ctrl+C
+                for future in futures:
+                    future.cancel()
+                self.metadata_cache.save()
+
+    def fetch_metadata(self, items, media_type):
+        """Fetch metadata for many links at once in batches on a worker pool
+
+        Results are written into the JSON store as each batch finishes, so
+        an interrupted prefetch keeps everything resolved so far.
+        """
+        total = len(items)
+        if total == 0:
+            return
+
+        fetched = 0
+        formats = {}  # format selector -> links resolved with it
+        for item in items:
+            fmt = self.metadata_format(media_type, item.get("format", ""))
+            formats.setdefault(fmt, []).append(item["link"])
+        results = itertools.chain.from_iterable(
+            self.resolve_metadata(links, fmt) for fmt, links in formats.items()
+        )
+        for link, title, filesize in results:
+            fetched += 1
+            print(f"\r  [{fetched}/{total}] Fetching...", end="", flush=True)
+
+            # Update metadata in JSON
+            fields = {}
+            if title and title != "[Timeout]":
+                fields["title"] = title
+            if filesize:
+                fields["filesize"] = filesize
+            if fields:
+                self.update_link(link, media_type, **fields)
+
+    def scan_downloaded_files(self, download_path):
+        """Refresh and return the index of files already on disk
+
+        Only directories whose mtime changed since the last scan are re-read.
+        """
+        with self.metrics.span("scan_downloaded_files"):
+            if self.file_index is None:
+                self.file_index = FileIndex(self.json_file.with_suffix(".files.json"))
+            return self.file_index.refresh([download_path])
+
+    def on_disk(self, link, media_type, partials):
+        """Bytes of a link's unfinished download already on disk (0 if none)
+
+        partials is FileIndex.partials() of the download folder. Audio is
+        resumed from the link's source folder, video from the partial
+        files with its ID next to the finished ones.
+        """
+        if media_type == "audio":
+            files = partials["audio"].get(link_hash(link), ())
+        else:
+            groups = partials["video"]
+            files = [f for key in video_partials(link, groups) for f in groups[key]]
+        return sum(size for _, size in files)
+
+    def clean_partials(self):
+        """Delete unfinished downloads that no stored link will resume
+
+        Looks in every folder the file index knows, plus the download
+        folder. Partial files and source folders count as orphaned when
+        their link was removed from the catalogue or is already downloaded;
+        failed links keep theirs for a retry. Links another worker process
+        holds are left alone. Returns the number of bytes freed.
+        """
+
+        def unfinished(media_type):
+            return [
+                item["link"]
+                for item in self.store.links(media_type)
+                if "link" in item and not item.get("is_downloaded")
+            ]
+
+        taken = self.leases.taken()
+        videos = unfinished("video") + list(taken)
+        keep = {"audio": {link_hash(link) for link in [*unfinished("audio"), *taken]}}
+
+        index = self.scan_downloaded_files(self.get_download_path())
+        removed = freed = 0
+        for directory in list(index.dirs):
+            partials = index.partials(directory)
+            keep["video"] = set()
+            for link in videos:
+                keys = video_partials(link, partials["video"])
+                if not keys and not extract_video_id(link):
+                    # Its files could carry any ID, so none can be deleted
+                    keep["video"] = set(partials["video"])
+                    break
+                keep["video"].update(keys)
+            for media_type, groups in partials.items():
+                for key, files in groups.items():
+                    if key in keep[media_type]:
+                        continue
+                    for path, size in files:
+                        try:
+                            os.remove(path)
+                        except OSError:
+                            continue
+                        removed += 1
+                        freed += size
+                    if media_type == "audio":
+                        shutil.rmtree(
+                            os.path.join(directory, SOURCE_DIR, key),
+                            ignore_errors=True,
+                        )
+        print(
+            f"🧹 Removed {removed} orphaned partial file(s), "
+            f"freed {self.format_size(freed) if freed else '0 MB'}"
+        )
+        return freed
 
-    def scan_downloaded_files(self, download_path):
-        """Scan directory and return set of normalized filenames"""
-        if not os.path.exists(download_path):
-            return set()
-
-        downloaded = set()
-        for file in Path(download_path).glob("*.opus"):
-            # Normalize filename: remove extension and common yt-dlp suffixes
-            name = file.stem
-            # Remove [videoID] patterns
-            name = re.sub(r"\s*\[[\w-]+\]\s*$", "", name)
-            downloaded.add(name.lower().strip())
-
-        return downloaded
-
-    def is_already_downloaded(self, title, downloaded_files):
-        """Check if a title matches any downloaded file"""
-        if not title:
-            return False
-        normalized_title = title.lower().strip()
-        # Also check partial matches (first 30 chars)
-        title_prefix = (
-            normalized_title[:30] if len(normalized_title) > 30 else normalized_title
-        )
-
-        for downloaded in downloaded_files:
-            if normalized_title == downloaded or title_prefix in downloaded:
-                return True
-        return False
+    def is_already_downloaded(self, link, title, downloaded_files, media_type):
+        """Check if a link's video is among the downloaded files"""
+        video_id = extract_video_id(link)
+        if video_id and downloaded_files.has(video_id, media_type):
+            return True
+        # Older downloads without an [id] in the filename
+        return bool(title) and downloaded_files.has_title(title)
+
+    def format_remaining(self, job):
+        """Size of a pending job, or what is left of it for a resumed one"""
+        if not job.get("on_disk") or not job["filesize"]:
+            return self.format_size(job["filesize"])
+        left = remaining_bytes(job)
+        return f"{self.format_size(left) if left else '0.0 MB'} left"
 
     def format_size(self, size_bytes):
         """Format bytes to MB or GB"""
@@ -203,304 +3159,824 @@ class YTDawn:
             return f"{mb / 1024:.1f} GB"
         return f"{mb:.1f} MB"
 
-    def download_audio(self, link, title=""):
-        """Download audio using yt-dlp with minimal output"""
-        download_path = self.get_download_path()
+    def download_audio(self, link, title="", on_progress=None, limit=None):
+        """Download a link's audio stream using yt-dlp with minimal output
 
-        # Display title (truncated to 30 chars)
-        display_title = title if title else link
-        if len(display_title) > 30:
-            display_title = display_title[:30] + "..."
-        print(f"\n▶ {display_title}")
+        The stream is saved as-is into source_dir() for convert_audio().
+        Progress is reported to on_progress and nothing is printed, so a
+        caller can render several downloads at once.
+        """
 
-        cmd = [
-            "yt-dlp",
-            "-x",
-            "-f",
-            "bestaudio",
-            "--audio-format",
-            "opus",
-            "-P",
+        def download(link, download_path, on_progress):
+            source_dir = self.source_dir(download_path, link)
+            return self.engine.download_audio(link, source_dir, on_progress, limit)
+
+        return self._download(download, link, title, on_progress)
+
+    def source_dir(self, download_path, link):
+        """Folder a link's native audio stream is downloaded into
+
+        It is named after the link, so an interrupted download or conversion
+        is resumed from the same place, and is hidden from the file index.
+        """
+        return str(Path(download_path) / SOURCE_DIR / link_hash(link))
+
+    def convert_audio(self, item, download_path, board):
+        """Queue conversion of a downloaded audio stream, return its future
+
+        The link is marked downloaded once the converted file is in place,
+        before the future completes.
+        """
+        link = item["link"]
+
+        def done(result, error):
+            board.convert_finish(item["title"], error is None)
+            if error is not None and (
+                self.stopping.is_set()
+                or killed_by_signal(getattr(error, "returncode", None))
+            ):
+                # ffmpeg got the Ctrl+C; the source stays for the next run
+                self.leases.release(link)
+                return
+            if error is not None:
+                self.record_failure(item, "audio", error, kind="conversion")
+                return
+            path, outcome = result
+            self.emit("converted", link=link, file=path, result=outcome)
+            self.record_download(item, "audio")
+            self.emit_finished(item, "audio", True)
+
+        def cancelled(future):
+            # Runs in cancel(), for conversions dropped before they started
+            if future.cancelled():
+                board.convert_finish(item["title"], False)
+                self.leases.release(link)
+
+        future = self.transcoder.submit(
+            self.source_dir(download_path, link),
             download_path,
-            "--continue",  # Resume partial downloads
-            "--no-warnings",
-            "--no-playlist",
-            "--quiet",
-            "--progress",
-            "--newline",
-            link,
-        ]
+            item["format"] or "opus",
+            done,
+        )
+        future.add_done_callback(cancelled)
+        return future
 
-        try:
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
-                universal_newlines=True,
-                creationflags=subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0,
+    def record_download(self, item, media_type, fetched_title=""):
+        """Mark a finished job downloaded, keeping the best known title"""
+        link = item["link"]
+        title = item["title"]
+        fields = {"is_downloaded": True}
+        if fetched_title:
+            fields["title"] = fetched_title
+        elif title and title != link:
+            fields["title"] = title
+        self.update_link(link, media_type, **fields)
+        self.leases.release(link)
+
+    def claim(self, item, media_type, download_path, board, limiter):
+        """Take a job's lease, False if another worker has it or did it
+
+        The download folder is checked again after claiming, since another
+        worker may have finished the link after this batch was read.
+        """
+        link = item["link"]
+        if self.leases.claim(link):
+            downloaded_files = self.scan_downloaded_files(download_path)
+            if not self.is_already_downloaded(
+                link, item["title"], downloaded_files, media_type
+            ):
+                return True
+            self.record_download(item, media_type)
+            reason = "Already downloaded"
+        else:
+            reason = "Taken by another worker"
+        board.skip(item["title"], item["filesize"], reason)
+        limiter.add(-1)
+        return False
+
+    def download_video(self, link, title="", on_progress=None, fmt="", limit=None):
+        """Download video using yt-dlp with minimal output
+
+        fmt is the record's format field (see video_format()). Progress and
+        output work as in download_audio().
+        """
+
+        def download(link, download_path, on_progress):
+            return self.engine.download_video(
+                link, download_path, on_progress, limit=limit, **self.video_options(fmt)
             )
 
-            last_progress = ""
-            for line in process.stdout:
-                line = line.strip()
-                if not line:
-                    continue
+        return self._download(download, link, title, on_progress)
 
-                # Filter progress lines
-                if "[download]" in line and "%" in line:
-                    # Extract percentage and speed
-                    percent_match = re.search(r"(\d+(?:\.\d+)?%)", line)
-                    speed_match = re.search(r"at\s+([\d.]+\s*[KMG]iB/s)", line)
-
-                    if percent_match:
-                        progress = percent_match.group(1)
-                        speed = speed_match.group(1) if speed_match else ""
-
-                        if progress != last_progress:
-                            # Simple progress bar
-                            percent = float(progress.rstrip("%"))
-                            bar_length = 30
-                            filled = int(bar_length * percent / 100)
-                            bar = "█" * filled + "░" * (bar_length - filled)
-
-                            # Show speed on the right if available
-                            if speed:
-                                print(
-                                    f"\r[{bar}] {progress} @ {speed}",
-                                    end="",
-                                    flush=True,
-                                )
-                            else:
-                                print(f"\r[{bar}] {progress}", end="", flush=True)
-                            last_progress = progress
+    def video_options(self, fmt=""):
+        """Engine download_video() options for a record's format field"""
+        max_height = self.max_height or self.meta.get("video-max-height")
+        selector, container = video_format(
+            fmt or self.meta.get("video-format", ""), max_height and int(max_height)
+        )
+        return {
+            "selector": selector,
+            "container": container,
+            "fragments": self.get_fragment_jobs(),
+        }
 
-            process.wait()
+    def get_fragment_jobs(self):
+        """Get the fragments fetched at once per download from CLI or meta"""
+        fragments = self.fragments or self.meta.get(
+            "fragment-jobs", DEFAULT_FRAGMENT_JOBS
+        )
+        return max(1, int(fragments))
 
-            if process.returncode == 0:
-                print(f"\r[{'█' * 30}] 100%" + " " * 20)  # Clear speed text
-                print("Completed\n")
-                return True, title
-            else:
-                print(f"\nFailed\n")
-                return False, ""
+    def _download(self, download, link, title, on_progress):
+        """Run download(link, path, on_progress), return (success, title)
 
-        except FileNotFoundError:
-            print("❌ Error: yt-dlp not found. Please install it first:")
-            print("   pip install yt-dlp")
-            return False, ""
-        except Exception as e:
-            print(f"\nFailed: {str(e)}\n")
-            return False, ""
-
-    def download_video(self, link):
-        """Download video - Currently not implemented"""
-        print("📹 Video download is not yet implemented.")
-        print("   Currently only audio downloads are supported.")
+        Errors are left to the caller, which records the cause.
+        """
+        if download(link, self.get_download_path(), on_progress):
+            return True, title
         return False, ""
 
-    def normalize_links(self, media_type):
-        """Normalize manually added links - ensure all fields exist"""
-        links = self.data.get(media_type, {}).get("links", [])
-        modified = False
+    def run_batch(self, records, media_type):
+        """Download the given pending records, return how many were queued
 
-        for item in links:
-            # Ensure required fields exist
-            if "link" not in item:
-                continue  # Skip invalid entries
+        Files already on disk are recognised by video ID before anything is
+        fetched. The rest get their missing metadata resolved, are previewed
+        and downloaded, and the journal is folded into the catalogue. Links
+        whose retry backoff hasn't run out yet, or that another worker
+        process has claimed, are left for later.
+        """
+        now = time.time()
+        taken = self.leases.taken()
+        records = [
+            item
+            for item in records
+            if item.get("retry_at", 0) <= now and item["link"] not in taken
+        ]
+        if not records:
+            return 0
 
-            if "is_downloaded" not in item:
-                item["is_downloaded"] = False
-                modified = True
+        download_path = self.get_download_path()
+        downloaded_files = self.scan_downloaded_files(download_path)
 
-            if "format" not in item:
-                item["format"] = "opus" if media_type == "audio" else ""
-                modified = True
+        to_check = []
+        for item in records:
+            video_id = extract_video_id(item["link"])
+            if video_id and downloaded_files.has(video_id, media_type):
+                self.update_link(
+                    item["link"],
+                    media_type,
+                    is_downloaded=True,
+                    path=download_path,
+                )
+            else:
+                to_check.append(item)
 
-            if "path" not in item:
-                item["path"] = ""
-                modified = True
+        if self.engine.name == "asyncio":
+            import asyncio
 
-            # Title will be fetched automatically when downloading
-            if "title" not in item:
-                item["title"] = ""
-                modified = True
+            # Metadata fetching and downloading overlap on one event loop
+            return asyncio.run(
+                self.pipeline_downloads(
+                    to_check, media_type, download_path, downloaded_files
+                )
+            )
 
-        if modified:
-            self.save_json()
+        # Collect links that need a metadata fetch
+        to_fetch = [
+            item
+            for item in to_check
+            if not item.get("title") or not item.get("filesize")
+        ]
+        need_fetch = len(to_fetch)
 
-        return modified
+        if need_fetch > 0:
+            print(f"\n⏳ Fetching metadata for {need_fetch} link(s)...")
+
+        # Fetch all missing metadata at once on the worker pool
+        self.fetch_metadata(to_fetch, media_type)
+
+        # Unfinished downloads already on disk, resumed by --continue
+        partials = downloaded_files.partials(download_path)
+
+        # Collect pending links with metadata
+        pending_items = []
+        for record in to_check:
+            # Re-read the record so freshly fetched metadata is included
+            _, item = self.store.find(record["link"], media_type)
+            if item is None or item.get("is_downloaded", False):
+                continue
+            link = item["link"]
+            title = item.get("title", "")
+            filesize = item.get("filesize", 0)
+
+            # Check if file already exists in directory
+            if self.is_already_downloaded(link, title, downloaded_files, media_type):
+                # Mark as downloaded in JSON
+                self.update_link(
+                    link,
+                    media_type,
+                    is_downloaded=True,
+                    title=title,
+                    path=download_path,
+                )
+                continue
+
+            pending_items.append(
+                {
+                    "item": item,
+                    "link": link,
+                    "title": title if title else link,
+                    "filesize": filesize,
+                    "format": item.get("format", ""),
+                    "priority": item.get("priority", 0),
+                    "on_disk": self.on_disk(link, media_type, partials),
+                }
+            )
+
+        # Clear progress line
+        if need_fetch > 0:
+            print("\r" + " " * 50 + "\r", end="", flush=True)
+
+        if not pending_items:
+            return 0
+
+        for item in pending_items:
+            self.emit(
+                "queued",
+                link=item["link"],
+                media_type=media_type,
+                title=item["title"],
+                filesize=item["filesize"],
+            )
+
+        # ===== PREVIEW PHASE =====
+        print("\nPending downloads:")
+        print("-" * 50)
+
+        total_size = 0
+        max_title_len = 30  # Maximum title display length
+        resumed = 0
+
+        # In download order, so the resumed downloads show up first
+        pending_items = self.order_pending(pending_items)
+        for item in pending_items:
+            title = item["title"]
+            # What is left to fetch: the size minus what is already on disk
+            size = remaining_bytes(item)
+
+            # Truncate long titles
+            if len(title) > max_title_len:
+                display_title = title[: max_title_len - 3] + "..."
+            else:
+                display_title = title
+
+            size_str = self.format_remaining(item)
+            resumed += bool(item["on_disk"])
+
+            # Right-align size in a 12-char field
+            print(f"{display_title:<30} {size_str:>12}")
+            total_size += size
+
+        print("-" * 50)
+        resumes = f" ({resumed} resumed)" if resumed else ""
+        print(
+            f"Total: {len(pending_items)} files{resumes} | "
+            f"{self.format_size(total_size)}"
+        )
+
+        # ===== DOWNLOAD PHASE =====
+        print("\nDownloading:")
+        started = time.monotonic()
+        self.download_pending(pending_items, media_type, download_path)
+
+        # Fold the batch's journal into downloads.json
+        self.save_json()
+        self.export_metrics()
+        if self.events:
+            self.events.summary(
+                media_type=media_type, seconds=round(time.monotonic() - started, 3)
+            )
+        return len(pending_items)
 
     def process_downloads(self, media_type):
         """Process all pending downloads with clean preview and download phases"""
 
         while True:  # Loop to check for new links
             # Reload JSON to get any newly added links
-            self.data = self.load_json()
-            links = self.data.get(media_type, {}).get("links", [])
+            self.load_json()
 
-            if not links:
-                print(f"\n📭 No {media_type} links found in {self.json_file}")
+            if not self.store.count(media_type):
+                print(f"\n📭 No {media_type} links found in {self.store.path}")
                 return
 
             # Normalize manually added links
             self.normalize_links(media_type)
 
-            # Get download path and scan for existing files
-            download_path = self.get_download_path()
-            downloaded_files = self.scan_downloaded_files(download_path)
-
-            # Collect pending links with metadata
-            pending_items = []
-
-            # Count total pending items for progress indication
-            pending_count = sum(
-                1 for item in links if not item.get("is_downloaded", False)
-            )
+            if not self.run_batch(self.store.pending(media_type), media_type):
+                retry_at = self.next_retry(media_type)
+                taken = self.leases.taken()
+                if retry_at:
+                    wait = format_eta(retry_at - time.time())
+                    print(f"⏳ Failed {media_type} links will be retried in {wait}")
+                elif any(i["link"] in taken for i in self.store.pending(media_type)):
+                    print(f"🔒 Other workers are downloading the rest of {media_type}")
+                else:
+                    print(f"✅ All {media_type} links are already downloaded!")
+                return  # Exit the loop - no more pending downloads
 
-            # Count how many need metadata fetch
-            need_fetch = sum(
-                1
-                for item in links
-                if not item.get("is_downloaded", False)
-                and (not item.get("title") or not item.get("filesize"))
-            )
+            print("\n✅ Batch completed! Checking for new links...")
+            # Loop continues - will reload JSON and check for new links
 
-            if need_fetch > 0:
-                print(f"\n⏳ Fetching metadata for {need_fetch} link(s)...")
+    def add_link_interactive(self, media_type):
+        """Interactive link addition"""
+        print(f"\n➕ Add new {media_type} link")
+        link = input("Enter URL (or 'back' to return): ").strip()
 
-            processed = 0
-            fetched = 0
-            for item in links:
-                # Skip if already marked as downloaded in JSON
-                if item.get("is_downloaded", False):
-                    continue
+        if link.lower() == "back" or not link:
+            return
 
-                link = item["link"]
-                processed += 1
+        if collection_kind(link):
+            self.expand_collection(link, media_type)
+            return
 
-                # Check if we already have metadata cached
-                title = item.get("title", "")
-                filesize = item.get("filesize", 0)
+        self.add_or_update_link(link, media_type)
+        print(f"✅ Added {media_type} link: {link}")
 
-                # Only fetch if metadata is missing
-                if not title or not filesize:
-                    fetched += 1
-                    # Show progress only when actually fetching
-                    print(
-                        f"\r  [{fetched}/{need_fetch}] Fetching...", end="", flush=True
-                    )
-                    # Fetch metadata silently
-                    title, filesize = self.get_video_metadata(link)
-
-                    # Update metadata in JSON
-                    idx, _ = self.find_link(link, media_type)
-                    if idx is not None:
-                        if title and title != "[Timeout]":
-                            self.data[media_type]["links"][idx]["title"] = title
-                        if filesize:
-                            self.data[media_type]["links"][idx]["filesize"] = filesize
-                        self.save_json()
-
-                # Check if file already exists in directory
-                if self.is_already_downloaded(title, downloaded_files):
-                    # Mark as downloaded in JSON
-                    idx, _ = self.find_link(link, media_type)
-                    if idx is not None:
-                        self.data[media_type]["links"][idx]["is_downloaded"] = True
-                        self.data[media_type]["links"][idx]["title"] = title
-                        self.data[media_type]["links"][idx]["path"] = download_path
-                    continue
+    def next_retry(self, media_type):
+        """Earliest retry_at of pending links waiting out a backoff, or None"""
+        now = time.time()
+        waiting = [
+            item["retry_at"]
+            for item in self.store.pending(media_type)
+            if item.get("retry_at", 0) > now
+        ]
+        return min(waiting, default=None)
 
-                pending_items.append(
-                    {
-                        "item": item,
-                        "link": link,
-                        "title": title if title else link,
-                        "filesize": filesize,
-                    }
+    def retry_failed(self, media_type):
+        """Make links given up on (and waiting ones) pending again right away"""
+        count = 0
+        for item in self.store.links(media_type):
+            if item.get("failed") or item.get("retry_at"):
+                self.update_link(
+                    item["link"], media_type, failed=False, retry_at=0, attempts=0
                 )
+                self.leases.clear(item["link"])
+                count += 1
+        print(f"🔁 {count} {media_type} link(s) will be retried")
 
-            # Save any updates (files detected as already downloaded and titles updated)
-            self.save_json()
+    def watch_downloads(self, media_type, interval=None):
+        """Download pending links, then keep running and fetch new ones
 
-            # Clear progress line
-            if need_fetch > 0:
-                print("\r" + " " * 50 + "\r", end="", flush=True)
+        Only the catalogue's mtime and size (or SQLite's data_version) are
+        checked while idle. When they change, just the links added since
+        the last check are resolved and downloaded; the rest of the
+        catalogue is not walked again. Failed links are retried when their
+        backoff runs out.
+        """
+        interval = interval or self.meta.get("watch-interval", DEFAULT_WATCH_INTERVAL)
+        self.process_downloads(media_type)
 
-            if not pending_items:
-                print(f"✅ All {media_type} links are already downloaded!")
-                return  # Exit the loop - no more pending downloads
+        cursor = self.store.cursor(media_type)
+        signature = self.store.signature()
+        retry_at = self.next_retry(media_type)
+        print(f"\n👀 Watching {self.store.path} for new {media_type} links...")
+        print("   Press Ctrl+C to stop")
 
-            # ===== PREVIEW PHASE =====
-            print("\nPending downloads:")
-            print("-" * 50)
+        while True:
+            time.sleep(interval)
+            if retry_at and time.time() >= retry_at:
+                self.load_json()
+                records = self.store.pending(media_type)
+                cursor = self.store.cursor(media_type)
+            elif self.store.signature() == signature:
+                continue
+            else:
+                self.load_json()
+                records, cursor = self.store.added_since(media_type, cursor)
+            for item in records:
+                # Fill in fields missing from hand-added entries
+                for key, value in new_link_record(item["link"], media_type).items():
+                    item.setdefault(key, value)
 
-            total_size = 0
-            max_title_len = 30  # Maximum title display length
+            if records and self.run_batch(records, media_type):
+                print("\n✅ Batch completed!")
+                print(f"👀 Watching {self.store.path} for new {media_type} links...")
+                retry_at = self.next_retry(media_type)
+            elif retry_at and time.time() >= retry_at:
+                retry_at = self.next_retry(media_type)
+            # Our own save changes the signature too; start from here
+            signature = self.store.signature()
 
-            for item in pending_items:
-                title = item["title"]
-                size = item["filesize"]
+    def get_rate_limit(self, now=None):
+        """Total download rate in bytes/s right now (None = unlimited)
 
-                # Truncate long titles
-                if len(title) > max_title_len:
-                    display_title = title[: max_title_len - 3] + "..."
-                else:
-                    display_title = title
+        --limit-rate wins; otherwise the first meta.bandwidth-profiles entry
+        whose "from"-"to" window (HH:MM, may wrap midnight) contains the
+        current time, else meta.bandwidth-limit.
+        """
+        if self.rate_limit:
+            return self.rate_limit
+        clock = time.strftime("%H:%M", time.localtime(now))
+        limit = self.meta.get("bandwidth-limit")
+        for profile in self.meta.get("bandwidth-profiles") or []:
+            start, end = profile["from"], profile["to"]
+            if start <= clock < end or (start > end and not end <= clock < start):
+                limit = profile.get("limit")
+                break
+        return parse_rate(limit) if limit else None
 
-                size_str = self.format_size(size)
+    def get_download_jobs(self):
+        """Get the number of parallel downloads from CLI, meta or default"""
+        jobs = self.jobs or self.meta.get("download-jobs", DEFAULT_DOWNLOAD_JOBS)
+        return max(1, int(jobs))
 
-                # Right-align size in a 12-char field
-                print(f"{display_title:<30} {size_str:>12}")
-                total_size += size
+    def order_pending(self, pending_items):
+        """Sort pending items by the configured download order policy
 
-            print("-" * 50)
-            print(f"Total: {len(pending_items)} files | {self.format_size(total_size)}")
+        fifo keeps JSON order, smallest gets the first files done sooner and
+        largest starts the long transfers first to shorten the total makespan.
+        Links with an unknown size go last under both size policies.
+        Downloads that were interrupted go before those, the ones with the
+        fewest bytes left first, and links with a higher "priority" field
+        before all of them.
+        """
+        order = self.order or self.meta.get("download-order", "fifo")
+        if order == "smallest":
+            ordered = sorted(
+                pending_items, key=lambda i: (not i["filesize"], i["filesize"])
+            )
+        elif order == "largest":
+            ordered = sorted(
+                pending_items, key=lambda i: (not i["filesize"], -i["filesize"])
+            )
+        else:
+            ordered = list(pending_items)
+        # Higher priority, then resumes; the sort is stable, so the policy
+        # applies within each group
+        return sorted(ordered, key=lambda i: (-i.get("priority", 0), resume_rank(i)))
 
-            # ===== DOWNLOAD PHASE =====
-            print("\nDownloading:")
+    def download_one(self, item, media_type, board, limiter):
+        """Run one download job, feeding its progress into the board
 
-            for item in pending_items:
-                link = item["link"]
-                title = item["title"]
+        Returns (None, "") without downloading when another worker process
+        has the link.
+        """
+        link = item["link"]
+        download_path = self.get_download_path()
+        if not self.claim(item, media_type, download_path, board, limiter):
+            return None, ""
+        board.start(link, item["title"], item["filesize"])
+        limit = limiter.acquire(link)
+        self.emit(
+            "started",
+            link=link,
+            media_type=media_type,
+            title=item["title"],
+            limit=limit,
+        )
 
-                # Update path BEFORE downloading (in case of interruption)
-                idx, _ = self.find_link(link, media_type)
-                if idx is not None:
-                    self.data[media_type]["links"][idx]["path"] = download_path
-                    self.save_json()
+        on_progress = self.progress_callback(link, board.update)
 
+        error = None
+        interrupted = False
+        with self.metrics.span("download") as span:
+            try:
                 if media_type == "audio":
-                    success, fetched_title = self.download_audio(link, title)
+                    success, fetched_title = self.download_audio(
+                        link, item["title"], on_progress, limit
+                    )
                 elif media_type == "video":
-                    success, fetched_title = self.download_video(link)
+                    success, fetched_title = self.download_video(
+                        link, item["title"], on_progress, item["format"], limit
+                    )
                 else:
                     success, fetched_title = False, ""
+            except DownloadInterrupted:
+                success, fetched_title, interrupted = False, "", True
+            except Exception as e:
+                success, fetched_title, error = False, "", e
+            finally:
+                limiter.release(link)
+            # Children die with Ctrl+C too, sometimes before the main thread
+            # sees it; neither is the link's fault
+            interrupted = interrupted or self.stopping.is_set()
+            span["result"] = (
+                "ok" if success else ("interrupted" if interrupted else "failed")
+            )
+            span["bytes"] = item["filesize"] if success else 0
 
-                if success:
-                    # Mark as downloaded and update title if needed
-                    idx, _ = self.find_link(link, media_type)
-                    if idx is not None:
-                        self.data[media_type]["links"][idx]["is_downloaded"] = True
-                        if fetched_title:
-                            self.data[media_type]["links"][idx]["title"] = fetched_title
-                        elif title and title != link:
-                            self.data[media_type]["links"][idx]["title"] = title
-                        self.save_json()
+        convert = media_type == "audio"
+        board.finish(link, success, convert)
+        if interrupted and not success:
+            # Resumed first on the next run, without using up an attempt
+            self.leases.release(link)
+        elif not success:
+            self.record_failure(item, media_type, error)
+        elif not convert:
+            self.emit_finished(item, media_type, success)
+        return success, fetched_title
 
-            print("\n✅ Batch completed! Checking for new links...")
-            # Loop continues - will reload JSON and check for new links
-        """Interactive link addition"""
-        print(f"\n➕ Add new {media_type} link")
-        link = input("Enter URL (or 'back' to return): ").strip()
+    def emit_finished(self, item, media_type, success, **fields):
+        """Emit "completed" or "failed" for a finished download"""
+        self.emit(
+            "completed" if success else "failed",
+            link=item["link"],
+            media_type=media_type,
+            title=item["title"],
+            filesize=item["filesize"],
+            **fields,
+        )
 
-        if link.lower() == "back" or not link:
-            return
+    def record_failure(self, item, media_type, error, kind=None):
+        """Store why a download failed and when it may be retried
 
-        self.add_or_update_link(link, media_type)
-        print(f"✅ Added {media_type} link: {link}")
+        The attempt count, cause and message are kept on the record. Once
+        the cause's RETRY_POLICY attempts are used up (or the video is
+        unavailable) the link is marked "failed" and no longer pending;
+        otherwise it is skipped until "retry_at".
+        """
+        link = item["link"]
+        kind = kind or classify_failure(error)
+        if isinstance(error, subprocess.CalledProcessError) and error.stderr:
+            lines = error.stderr.decode("utf-8", "replace").strip().splitlines()
+            message = lines[-1] if lines else str(error)
+        else:
+            message = str(error or "download failed")
+        _, record = self.store.find(link, media_type)
+        attempts = (record or {}).get("attempts", 0) + 1
+
+        fields = {"attempts": attempts, "error_kind": kind, "last_error": message}
+        delay = retry_delay(kind, attempts)
+        if delay is None:
+            fields["failed"] = True
+        else:
+            fields["retry_at"] = round(time.time() + delay)
+        self.update_link(link, media_type, **fields)
+        if delay is None:
+            self.leases.release(link)
+        else:
+            # Other workers may still list it as pending; keep them off it
+            self.leases.hold(link, fields["retry_at"])
+        self.emit_finished(item, media_type, False, **fields)
+
+    def download_pending(self, pending_items, media_type, download_path):
+        """Download pending items N at a time, recording each completion
+
+        Audio is handed to the conversion stage as each download finishes;
+        this returns once every conversion is done too.
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+
+        ordered = self.order_pending(pending_items)
+
+        # Update paths BEFORE downloading (in case of interruption)
+        for item in ordered:
+            self.update_link(item["link"], media_type, path=download_path)
+
+        board = ProgressBoard(
+            len(ordered), sum(item["filesize"] or 0 for item in ordered)
+        )
+        jobs = self.get_download_jobs()
+        limiter = BandwidthLimiter(self.get_rate_limit, jobs, len(ordered))
+        pool = ThreadPoolExecutor(max_workers=jobs)
+        futures = {
+            pool.submit(self.download_one, item, media_type, board, limiter): item
+            for item in ordered
+        }
+
+        conversions = []
+        try:
+            for future in as_completed(futures):
+                item = futures[future]
+                success, fetched_title = future.result()
+                if not success:
+                    continue
+                if media_type == "audio":
+                    conversions.append(self.convert_audio(item, download_path, board))
+                else:
+                    self.record_download(item, media_type, fetched_title)
+            wait(conversions)
+        except BaseException:
+            self.stopping.set()
+            raise
+        finally:
+            # On Ctrl+C drop queued jobs; running children get the signal too
+            for future in conversions:
+                future.cancel()
+            pool.shutdown(wait=True, cancel_futures=True)
+            wait(conversions)
+            self.leases.release_all()
+            board.close()
+
+    async def pipeline_downloads(
+        self, records, media_type, download_path, downloaded_files
+    ):
+        """Resolve metadata and download on one event loop, return jobs queued
+
+        Links with cached metadata are queued for download right away, in
+        the configured order; the rest are resolved in batches and queued as
+        each batch comes back, so downloads start before every lookup is
+        done. Each download is limited to meta.download-timeout seconds (if
+        set). Cancelling (Ctrl+C) kills every child process and keeps the
+        catalogue state recorded so far.
+        """
+        import asyncio
+
+        queue = asyncio.PriorityQueue()
+        conversions = []  # Audio conversions running alongside the downloads
+        board = ProgressBoard(0, 0)
+        jobs = self.get_download_jobs()
+        limiter = BandwidthLimiter(self.get_rate_limit, jobs)
+        timeout = self.meta.get("download-timeout")
+        queued = 0
+
+        def enqueue(item):
+            nonlocal queued
+            if not queued:
+                board.log("\nDownloading (metadata is fetched alongside):")
+            title = item.get("title") or item["link"]
+            pending = {"link": item["link"], "title": title}
+            pending["filesize"] = item.get("filesize", 0)
+            board.add_total(1, pending["filesize"])
+            self.emit("queued", media_type=media_type, **pending)
+            pending["format"] = item.get("format", "")
+            pending["on_disk"] = self.on_disk(item["link"], media_type, partials)
+            limiter.add()
+            # Urgent links, then resumes, jump ahead of everything not started
+            priority = item.get("priority", 0)
+            queue.put_nowait((-priority, resume_rank(pending), queued, pending))
+            size = self.format_remaining(pending)
+            board.log(f"+ {board._short(title):<30} {size:>12}")
+            # Update path BEFORE downloading (in case of interruption)
+            self.update_link(item["link"], media_type, path=download_path)
+            queued += 1
+
+        partials = downloaded_files.partials(download_path)
+        ready, to_fetch = [], {}  # format selector -> links to resolve with it
+        for item in records:
+            if item.get("title") and item.get("filesize"):
+                # For order_pending(), which puts resumes first
+                on_disk = self.on_disk(item["link"], media_type, partials)
+                ready.append({**item, "on_disk": on_disk})
+            else:
+                fmt = self.metadata_format(media_type, item.get("format", ""))
+                to_fetch.setdefault(fmt, []).append(item["link"])
+
+        for item in self.order_pending(ready):
+            if self.is_already_downloaded(
+                item["link"], item["title"], downloaded_files, media_type
+            ):
+                self.update_link(
+                    item["link"], media_type, is_downloaded=True, path=download_path
+                )
+            else:
+                enqueue(item)
+        # Links still being resolved count as waiting, so the first jobs
+        # don't take the whole budget before they are queued
+        limiter.add(sum(map(len, to_fetch.values())))
+
+        lookups = asyncio.Semaphore(self.get_metadata_workers())
+
+        async def resolve(batch, fmt):
+            async with lookups:
+                with self.metrics.span("metadata") as span:
+                    try:
+                        results = await self.engine.get_metadata_batch_async(
+                            batch, timeout=self._batch_timeout(batch), fmt=fmt
+                        )
+                    except Exception as e:
+                        results = {link: e for link in batch}
+                    span["result"] = self._batch_result(results)
+
+            for link, entry in self._cache_results(batch, results, fmt):
+                limiter.add(-1)  # enqueue() counts it again if it is queued
+                title, filesize = self._metadata_result(entry)
+                fields = {}
+                if title and title != "[Timeout]":
+                    fields["title"] = title
+                if filesize:
+                    fields["filesize"] = filesize
+                if fields:
+                    self.update_link(link, media_type, **fields)
+                # The whole record, so its format and priority are kept
+                _, item = self.store.find(link, media_type)
+                if item is None:
+                    continue  # Removed from the catalogue meanwhile
+
+                if self.is_already_downloaded(
+                    link, fields.get("title"), downloaded_files, media_type
+                ):
+                    self.update_link(
+                        link, media_type, is_downloaded=True, path=download_path
+                    )
+                else:
+                    enqueue(item)
+
+        async def worker():
+            while True:
+                *_, item = await queue.get()
+                if item is None:
+                    return
+                if not self.claim(item, media_type, download_path, board, limiter):
+                    continue
+                link = item["link"]
+                board.start(link, item["title"], item["filesize"])
+                limit = await limiter.acquire_async(link)
+                self.emit(
+                    "started",
+                    link=link,
+                    media_type=media_type,
+                    title=item["title"],
+                    limit=limit,
+                )
+
+                on_progress = self.progress_callback(link, board.update)
+
+                with self.metrics.span("download") as span:
+                    try:
+                        if media_type == "audio":
+                            download = self.engine.download_audio_async(
+                                link,
+                                self.source_dir(download_path, link),
+                                on_progress,
+                                limit,
+                            )
+                        else:
+                            download = self.engine.download_video_async(
+                                link,
+                                download_path,
+                                on_progress,
+                                limit=limit,
+                                **self.video_options(item["format"]),
+                            )
+                        success = await asyncio.wait_for(download, timeout)
+                        error = None
+                    except (
+                        asyncio.TimeoutError,
+                        OSError,
+                        DownloadFailed,
+                        DownloadInterrupted,
+                    ) as e:
+                        success, error = False, e
+                    finally:
+                        limiter.release(link)
+                    interrupted = isinstance(error, DownloadInterrupted)
+                    span["result"] = (
+                        "ok" if success else "interrupted" if interrupted else "failed"
+                    )
+                    span["bytes"] = item["filesize"] if success else 0
+
+                convert = media_type == "audio"
+                board.finish(link, success, convert)
+                if success and convert:
+                    conversions.append(
+                        asyncio.wrap_future(
+                            self.convert_audio(item, download_path, board)
+                        )
+                    )
+                elif success:
+                    self.emit_finished(item, media_type, success)
+                    self.record_download(item, media_type)
+                elif interrupted:
+                    self.leases.release(link)
+                else:
+                    self.record_failure(item, media_type, error)
+
+        size = self.get_metadata_batch_size()
+        batches = [
+            (links[i : i + size], fmt)
+            for fmt, links in to_fetch.items()
+            for i in range(0, len(links), size)
+        ]
+        fetchers = [asyncio.create_task(resolve(*batch)) for batch in batches]
+        workers = [asyncio.create_task(worker()) for _ in range(jobs)]
+
+        started = time.monotonic()
+        try:
+            await asyncio.gather(*fetchers)
+            for _ in workers:
+                queue.put_nowait((float("inf"), (), 0, None))
+            await asyncio.gather(*workers)
+            await asyncio.gather(*conversions, return_exceptions=True)
+        finally:
+            # On Ctrl+C or an error: cancel everything (killing the children)
+            for task in fetchers + workers + conversions:
+                task.cancel()
+            await asyncio.gather(
+                *fetchers, *workers, *conversions, return_exceptions=True
+            )
+            self.leases.release_all()
+            board.close()
+            self.metadata_cache.save()
+            self.save_json()
+            self.export_metrics()
+            if self.events and queued:
+                self.events.summary(
+                    media_type=media_type,
+                    seconds=round(time.monotonic() - started, 3),
+                )
+
+        return queued
 
     def show_menu(self):
         """Show main menu"""
@@ -510,23 +3986,11 @@ class YTDawn:
             print("=" * 60)
             print("\n📂 Current download folder:", self.get_download_path())
 
-            audio_count = len(self.data.get("audio", {}).get("links", []))
-            video_count = len(self.data.get("video", {}).get("links", []))
+            audio_count = self.store.count("audio")
+            video_count = self.store.count("video")
 
-            audio_pending = len(
-                [
-                    l
-                    for l in self.data.get("audio", {}).get("links", [])
-                    if not l.get("is_downloaded", False)
-                ]
-            )
-            video_pending = len(
-                [
-                    l
-                    for l in self.data.get("video", {}).get("links", [])
-                    if not l.get("is_downloaded", False)
-                ]
-            )
+            audio_pending = self.store.count("audio", pending=True)
+            video_pending = self.store.count("video", pending=True)
 
             print(f"🎵 Audio links: {audio_count} total, {audio_pending} pending")
             print(f"📹 Video links: {video_count} total, {video_pending} pending")
@@ -535,7 +3999,7 @@ class YTDawn:
 
             print("\n" + "-" * 60)
             print("1. Download Audio")
-            print("2. Download Video (not implemented)")
+            print("2. Download Video")
             print("3. Add Audio Link")
             print("4. Add Video Link")
             print("5. View All Links")
@@ -571,50 +4035,43 @@ class YTDawn:
 
         # First, check and fetch missing titles
         for media_type in ["audio", "video"]:
-            links = self.data.get(media_type, {}).get("links", [])
+            links = self.store.links(media_type)
             missing_titles = [item for item in links if not item.get("title")]
 
             if missing_titles:
                 print(
                     f"\n⏳ Fetching {len(missing_titles)} missing {media_type} title(s)..."
                 )
-                for idx, item in enumerate(missing_titles, 1):
+                # Batched and cached like the process_downloads prefetch
+                results = self.resolve_metadata(
+                    [item["link"] for item in missing_titles]
+                )
+                for idx, (link, title, _) in enumerate(results, 1):
                     print(
                         f"\r  [{idx}/{len(missing_titles)}] Fetching...",
                         end="",
                         flush=True,
                     )
 
-                    # Use get_video_title with timeout (faster than get_video_metadata)
-                    title = self.get_video_title(item["link"])
-
                     if title and title != "[Timeout]":
-                        # Find and update the item in the main list
-                        link_idx, _ = self.find_link(item["link"], media_type)
-                        if link_idx is not None:
-                            self.data[media_type]["links"][link_idx]["title"] = title
+                        self.update_link(link, media_type, title=title)
                     elif title == "[Timeout]":
                         # Mark timeout but continue
-                        link_idx, _ = self.find_link(item["link"], media_type)
-                        if link_idx is not None:
-                            self.data[media_type]["links"][link_idx][
-                                "title"
-                            ] = "[Failed to fetch]"
+                        self.update_link(link, media_type, title="[Failed to fetch]")
 
                 print("\r" + " " * 50 + "\r", end="", flush=True)
-                self.save_json()
                 print(f"✅ Updated {len(missing_titles)} title(s)")
 
         # Now display all links with titles
         for media_type in ["audio", "video"]:
-            links = self.data.get(media_type, {}).get("links", [])
+            links = self.store.links(media_type)
             print(f"\n{media_type.upper()} ({len(links)} links):")
 
             if not links:
                 print("  (none)")
             else:
                 for i, item in enumerate(links, 1):
-                    status = "✅" if item.get("is_downloaded", False) else "⏳"
+                    status = link_status(item)
                     title = item.get("title", "")
                     # Truncate long titles to 40 chars for viewing
                     if title:
@@ -634,8 +4091,7 @@ class YTDawn:
         ).strip()
 
         if new_path:
-            self.data["meta"]["default-path"] = new_path
-            self.save_json()
+            self.store.set_meta(**{"default-path": new_path})
             Path(new_path).mkdir(parents=True, exist_ok=True)
             print(f"✅ Download path updated to: {new_path}")
 
@@ -643,7 +4099,7 @@ class YTDawn:
 
     def list_links_cli(self, media_type):
         """List links for CLI mode (no menu, just output)"""
-        links = self.data.get(media_type, {}).get("links", [])
+        links = self.store.links(media_type)
 
         if not links:
             print(f"No {media_type} links found.")
@@ -653,7 +4109,7 @@ class YTDawn:
         print("-" * 60)
 
         for i, item in enumerate(links, 1):
-            status = "✅" if item.get("is_downloaded", False) else "⏳"
+            status = link_status(item)
             title = item.get("title", "")
 
             if title:
@@ -662,23 +4118,35 @@ class YTDawn:
             else:
                 print(f"{i}. {status} {item['link']}")
 
-    def add_link_cli(self, url, media_type):
-        """Add link via CLI (non-interactive)"""
+    def add_link_cli(self, url, media_type, priority=None):
+        """Add link via CLI (non-interactive)
+
+        With a priority the link is queued ahead of (or behind) the others;
+        an already known link just gets the new priority.
+        """
         if not url:
             print("❌ Error: No URL provided")
             sys.exit(1)
 
-        self.add_or_update_link(url, media_type)
+        if collection_kind(url):
+            self.expand_collection(url, media_type)
+            return
+
+        # Deduplicated by the store; downloads.json is not even parsed
+        self.store.add_many([new_link_record(url, media_type)], media_type)
+        if priority is not None:
+            # Also re-prioritizes a link that was already in the catalogue
+            self.update_link(url, media_type, priority=priority)
         print(f"✅ Added {media_type} link: {url}")
-        self.save_json()
 
 
 def main():
     """Main entry point"""
     try:
         # Parse command-line arguments
+        # The launcher runs main() from -c, which would name the program "-c"
         parser = argparse.ArgumentParser(
-            description="YTDawn - YouTube Audio/Video Downloader"
+            prog="ytdawn", description="YTDawn - YouTube Audio/Video Downloader"
         )
 
         parser.add_argument(
@@ -705,36 +4173,228 @@ def main():
         parser.add_argument(
             "-av", "--add-video", metavar="URL", help="Add a video link"
         )
+        parser.add_argument(
+            "--engine",
+            choices=ENGINES,
+            help="yt-dlp backend: in-process API or one subprocess per operation "
+            "(default: auto)",
+        )
+        parser.add_argument(
+            "--storage",
+            choices=STORAGES,
+            help="Catalogue backend (default: sqlite if downloads.db has links, "
+            "else json)",
+        )
+        parser.add_argument(
+            "--import-json",
+            metavar="FILE",
+            help="Replace the catalogue with a downloads.json file "
+            "(e.g. --storage sqlite --import-json downloads.json to migrate)",
+        )
+        parser.add_argument(
+            "--import",
+            dest="import_file",
+            metavar="FILE",
+            help="Add the links in FILE (or - for stdin): one URL per line, "
+            "CSV or JSON; duplicates are skipped",
+        )
+        parser.add_argument(
+            "--as",
+            dest="import_type",
+            choices=("audio", "video"),
+            default="audio",
+            help="With --import: media type of links that don't have one "
+            "(default: audio)",
+        )
+        parser.add_argument(
+            "--export-json",
+            metavar="FILE",
+            help="Write the catalogue to FILE in the downloads.json format",
+        )
+        parser.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            metavar="N",
+            help=f"Parallel downloads (default: {DEFAULT_DOWNLOAD_JOBS})",
+        )
+        parser.add_argument(
+            "--order",
+            choices=DOWNLOAD_ORDERS,
+            help="Download order: JSON order, smallest first or largest first "
+            "(default: fifo)",
+        )
+        parser.add_argument(
+            "-w",
+            "--workers",
+            type=int,
+            metavar="N",
+            help=f"Parallel metadata fetches (default: {DEFAULT_METADATA_WORKERS})",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            metavar="N",
+            help="URLs resolved per yt-dlp metadata call "
+            f"(default: {DEFAULT_METADATA_BATCH_SIZE})",
+        )
+        parser.add_argument(
+            "--max-height",
+            type=int,
+            metavar="PX",
+            help="With -dv: highest video resolution for links without a format "
+            "(e.g. 1080)",
+        )
+        parser.add_argument(
+            "-N",
+            "--fragments",
+            type=int,
+            metavar="N",
+            help="With -dv: fragments fetched at once per download "
+            f"(default: {DEFAULT_FRAGMENT_JOBS})",
+        )
+        parser.add_argument(
+            "--limit-rate",
+            type=parse_rate,
+            metavar="RATE",
+            help="Total download rate shared by all running downloads "
+            "(e.g. 500K, 4M; default: meta bandwidth-limit/-profiles)",
+        )
+        parser.add_argument(
+            "--priority",
+            type=int,
+            metavar="N",
+            help="With -aa/-av/--import: download priority of the link "
+            "(higher first, default 0)",
+        )
+        parser.add_argument(
+            "--retry-failed",
+            action="store_true",
+            help="With -da/-dv: first retry links that failed before, "
+            "including ones given up on",
+        )
+        parser.add_argument(
+            "--clean-partials",
+            action="store_true",
+            help="Delete unfinished downloads whose link was removed or is "
+            "already downloaded",
+        )
+        parser.add_argument(
+            "-W",
+            "--watch",
+            action="store_true",
+            help="With -da/-dv: keep running and download links as they are added",
+        )
+        parser.add_argument(
+            "--metrics",
+            metavar="FILE",
+            help="Write per-phase timings to FILE (JSON) and FILE.prom "
+            "(Prometheus textfile) after each batch and on exit",
+        )
+        parser.add_argument(
+            "--events",
+            choices=("ndjson",),
+            help="Write lifecycle events as NDJSON instead of console output",
+        )
+        parser.add_argument(
+            "--events-file",
+            metavar="FILE",
+            help="With --events: append events to FILE (default: stdout)",
+        )
+        parser.add_argument(
+            "--profile",
+            metavar="FILE",
+            help="Write a cProfile dump of the whole run to FILE",
+        )
 
         args = parser.parse_args()
 
+        if args.profile:
+            import cProfile
+
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+            def dump_profile():
+                profiler.disable()
+                profiler.dump_stats(args.profile)
+
+            atexit.register(dump_profile)
+
+        events = None
+        if args.events:
+            if args.events_file:
+                out = open(args.events_file, "a", encoding="utf-8")
+            else:
+                out = sys.stdout
+            events = EventStream(out)
+            # No interactive rendering: console output goes nowhere
+            sys.stdout = open(os.devnull, "w", encoding="utf-8")
+
+        app = YTDawn(
+            workers=args.workers,
+            engine=args.engine,
+            jobs=args.jobs,
+            order=args.order,
+            storage=args.storage,
+            batch_size=args.batch_size,
+            metrics_file=args.metrics,
+            events=events,
+            max_height=args.max_height,
+            fragments=args.fragments,
+            rate_limit=args.limit_rate,
+        )
+        if args.metrics:
+            atexit.register(app.export_metrics)
+
+        # Listing, imports/export and adding single links never run yt-dlp
+        added = args.add_audio or args.add_video
+        offline = (
+            args.import_json
+            or args.import_file
+            or args.clean_partials
+            or args.export_json
+            or args.list_audio
+            or args.list_video
+            or (added and not collection_kind(added))
+        )
+
         # Check if yt-dlp is installed
         try:
-            subprocess.run(["yt-dlp", "--version"], capture_output=True, check=True)
+            if not offline:
+                app.engine.probe(app.json_file.with_suffix(".probe.json"))
         except FileNotFoundError:
             print("\n❌ Error: yt-dlp is not installed!")
             print("\n📦 To install yt-dlp, run:")
             print("   pip install yt-dlp")
             print("\n   Or visit: https://github.com/yt-dlp/yt-dlp")
             sys.exit(1)
-        except subprocess.CalledProcessError:
-            pass  # yt-dlp exists but returned non-zero, that's ok
-
-        app = YTDawn()
 
         # Handle CLI commands
-        if args.list_audio:
+        if args.import_json:
+            app.import_json(args.import_json)
+        elif args.clean_partials:
+            app.clean_partials()
+        elif args.import_file:
+            app.import_links(args.import_file, args.import_type, args.priority)
+        elif args.export_json:
+            app.export_json(args.export_json)
+        elif args.list_audio:
             app.list_links_cli("audio")
         elif args.list_video:
             app.list_links_cli("video")
-        elif args.download_audio:
-            app.process_downloads("audio")
-        elif args.download_video:
-            app.process_downloads("video")
+        elif args.download_audio or args.download_video:
+            media_type = "audio" if args.download_audio else "video"
+            if args.retry_failed:
+                app.retry_failed(media_type)
+            if args.watch:
+                app.watch_downloads(media_type)
+            else:
+                app.process_downloads(media_type)
         elif args.add_audio:
-            app.add_link_cli(args.add_audio, "audio")
+            app.add_link_cli(args.add_audio, "audio", args.priority)
         elif args.add_video:
-            app.add_link_cli(args.add_video, "video")
+            app.add_link_cli(args.add_video, "video", args.priority)
         else:
             # No arguments - launch interactive menu
             print("🚀 Starting YTDawn...")